@@ -1,63 +1,35 @@
 """Testing all algorithms on the dataset."""
 from collections.abc import Sequence, Hashable
 import pandas as pd
-from data import prepare_dataset
+from dataset_cache import prepare_dataset_cached
+from evaluation import SelectionEvaluator
 from greedy import greedy_approach
 from local_search import local_search_first_improvement
 from simulated_annealing import simulated_annealing
 from grasp import grasp
+from dynamic_programming import dynamic_programming
 
 
-def evaluate_selection(data: pd.DataFrame, result: Sequence[Hashable]) -> dict:
-    """Evaluate selection against 'Violence' (just for reporting)."""
+def evaluate_selection(
+    data: pd.DataFrame,
+    result: Sequence[Hashable],
+    evaluator: SelectionEvaluator | None = None,
+) -> dict:
+    """Evaluate selection against 'Violence' (just for reporting).
+    Pass one evaluator of data to reuse it across selections."""
     if "Violence" not in data.columns:
         return {"note": "Violence column not found."}
-
-    idx = list(result)
-    if len(idx) == 0:
-        return {
-            "selected": 0, "selected_yes": 0,
-            "base_yes":
-                int((data["Violence"].astype(str).str.lower() == "yes").sum()),
-            "precision": 0.0, "recall": 0.0, "lift": 0.0,
-            "base_rate":
-                float((
-                    data["Violence"].astype(str).str.lower() == "yes").mean()),
-        }
-
-    sel = data.loc[idx]
-    sel_yes = int((sel["Violence"].astype(str).str.lower() == "yes").sum())
-    base_yes = int((data["Violence"].astype(str).str.lower() == "yes").sum())
-
-    precision = sel_yes / len(sel) if len(sel) else 0.0
-    recall = sel_yes / base_yes if base_yes else 0.0
-    base_rate = base_yes / len(data) if len(data) else 0.0
-    lift = (precision / base_rate) if base_rate > 0 else 0.0
-
-    return {
-        "selected": int(len(sel)),
-        "selected_yes": sel_yes,
-        "base_yes": base_yes,
-        "precision": precision,
-        "recall": recall,
-        "lift": lift,
-        "base_rate": base_rate,
-    }
+    return (evaluator or SelectionEvaluator(data)).evaluate(result)
 
 
-def yes_at_k(data: pd.DataFrame, choice, ks=(10, 15, 25)) -> dict:
+def yes_at_k(
+    data: pd.DataFrame,
+    choice,
+    ks=(10, 15, 25),
+    evaluator: SelectionEvaluator | None = None,
+) -> dict:
     """Count 'Violence' = 'yes' in top-k selected."""
-    out = {}
-    y = data["Violence"].astype(str).str.lower().eq("yes")
-    idx = list(choice)
-    for k in ks:
-        topk = idx[:k]
-        if not topk:
-            out[k] = {"yes": 0, "rate": 0.0}
-            continue
-        cnt = int(y.loc[pd.Index(topk)].sum())
-        out[k] = {"yes": cnt, "rate": cnt / len(topk)}
-    return out
+    return (evaluator or SelectionEvaluator(data)).yes_at_k(choice, ks)
 
 
 def print_top(
@@ -122,14 +94,16 @@ if __name__ == "__main__":
     N = 25
     SHOW_YES = (15, 35, 55)
 
-    df = prepare_dataset("data.csv")
+    df = prepare_dataset_cached("data.csv")
+    # the Violence mask is built once and shared by every report below
+    ev = SelectionEvaluator(df) if "Violence" in df.columns else None
 
     # Greedy
     g_choice, g_score, g_weight = greedy_approach(df, W)
-    g_eval = evaluate_selection(df, g_choice)
+    g_eval = evaluate_selection(df, g_choice, ev)
     print_summary("Greedy", g_weight, g_score, len(g_choice), g_eval)
     print_top(df, g_choice, N, "Greedy")
-    print("Greedy Yes", yes_at_k(df, g_choice, SHOW_YES))
+    print("Greedy Yes", yes_at_k(df, g_choice, SHOW_YES, ev))
     print("\n")
 
     # Local search (start = Greedy)
@@ -138,10 +112,10 @@ if __name__ == "__main__":
         max_no_improve=3,
         alpha=0.9, lambda_w=0.5
     )
-    ls_eval = evaluate_selection(df, ls_choice)
+    ls_eval = evaluate_selection(df, ls_choice, ev)
     print_summary("LS", ls_weight, ls_score, len(ls_choice), ls_eval)
     print_top(df, ls_choice, N, "Local Search")
-    print("LS Yes", yes_at_k(df, ls_choice, SHOW_YES))
+    print("LS Yes", yes_at_k(df, ls_choice, SHOW_YES, ev))
     print("\n")
 
     # Simulated annealing (start = Greedy)
@@ -149,10 +123,10 @@ if __name__ == "__main__":
         df, W, start_choice=g_choice,
         T0=10.0, Tmin=1e-3, alpha=0.97, iters_per_T=120, seed=0
     )
-    sa_eval = evaluate_selection(df, sa_choice)
+    sa_eval = evaluate_selection(df, sa_choice, ev)
     print_summary("SA", sa_weight, sa_score, len(sa_choice), sa_eval)
     print_top(df, sa_choice, N, "Simulated Annealing")
-    print("SA Yes", yes_at_k(df, sa_choice, SHOW_YES))
+    print("SA Yes", yes_at_k(df, sa_choice, SHOW_YES, ev))
     print("\n")
 
     # GRASP
@@ -163,7 +137,15 @@ if __name__ == "__main__":
         alpha=0.9, lambda_w=0.5
     )
 
-    gr_eval = evaluate_selection(df, gr_choice)
+    gr_eval = evaluate_selection(df, gr_choice, ev)
     print_summary("GRASP", gr_weight, gr_score, len(gr_choice), gr_eval)
     print_top(df, gr_choice, N, "GRASP")
-    print("GRASP Yes", yes_at_k(df, gr_choice, SHOW_YES))
+    print("GRASP Yes", yes_at_k(df, gr_choice, SHOW_YES, ev))
+    print("\n")
+
+    # Dynamic programming (exact optimum)
+    dp_choice, dp_score, dp_weight = dynamic_programming(df, W)
+    dp_eval = evaluate_selection(df, dp_choice, ev)
+    print_summary("DP", dp_weight, dp_score, len(dp_choice), dp_eval)
+    print_top(df, dp_choice, N, "Dynamic Programming")
+    print("DP Yes", yes_at_k(df, dp_choice, SHOW_YES, ev))
@@ -0,0 +1,288 @@
+"""Benchmarks on synthetic populations shaped like data.csv.
+
+python benchmark.py --sizes 1000 100000 --budgets 51 500 \\
+    --out report.json --baseline benchmark_baseline.json
+"""
+from collections.abc import Callable, Iterable, Sequence
+from typing import Any
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from data import prepare_dataset
+from instance import KnapsackInstance
+from greedy import greedy_approach
+from local_search import local_search_first_improvement
+from simulated_annealing import simulated_annealing, parallel_tempering
+from grasp import grasp
+from dynamic_programming import dynamic_programming
+from branch_and_bound import branch_and_bound
+
+REPORT_FORMAT = 1
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_BUDGETS = (51, 500)
+
+# name -> (call(inst, max_weight), row limit or None); parameters follow
+# all_test.py, limits keep the slow pure-Python heuristics within reach
+SOLVERS: dict[str, tuple[Callable, int | None]] = {
+    "greedy": (greedy_approach, None),
+    "local_search": (
+        lambda inst, W: local_search_first_improvement(
+            inst, W, max_no_improve=3, alpha=0.9, lambda_w=0.5),
+        1_000_000),
+    "simulated_annealing": (
+        lambda inst, W: simulated_annealing(
+            inst, W, T0=10.0, Tmin=1e-3, alpha=0.97, iters_per_T=120,
+            seed=0),
+        1_000_000),
+    "parallel_tempering": (
+        lambda inst, W: parallel_tempering(inst, W, chains=4, seed=0),
+        100_000),
+    "grasp": (
+        lambda inst, W: grasp(
+            inst, W, iterations=100, rcl_size=25, alpha=0.9, lambda_w=0.5),
+        100_000),
+    "dynamic_programming": (dynamic_programming, 1_000_000),
+    "branch_and_bound": (
+        lambda inst, W: branch_and_bound(inst, W, time_limit=10.0),
+        1_000_000),
+}
+# the DP table has items x capacity cells
+DP_MAX_CELLS = 500_000_000
+
+
+def column_marginals(path: str = "data.csv") -> dict[str, tuple]:
+    """(values, probabilities) of every raw column of the source file."""
+    raw = pd.read_csv(path)
+    out = {}
+    for col in raw.columns:
+        counts = raw[col].value_counts(dropna=False, normalize=True)
+        out[col] = (counts.index.to_numpy(), counts.to_numpy())
+    return out
+
+
+def synthetic_csv(
+    path: str,
+    n_rows: int,
+    *,
+    source: str = "data.csv",
+    seed: int = 0,
+    chunksize: int = 1_000_000,
+) -> None:
+    """Writes n_rows raw rows with every column drawn independently from
+    its marginal in source. The first column stays a running row number."""
+    marginals = column_marginals(source)
+    columns = list(marginals)
+    rng = np.random.default_rng(seed)
+    written = 0
+    with open(path, "w", newline="") as f:
+        while True:
+            m = min(chunksize, n_rows - written)
+            chunk = {
+                col: rng.choice(vals, size=m, p=probs)
+                for col, (vals, probs) in marginals.items()
+            }
+            chunk[columns[0]] = np.arange(written + 1, written + m + 1)
+            pd.DataFrame(chunk, columns=columns).to_csv(
+                f, index=False, header=written == 0)
+            written += m
+            if written >= n_rows:
+                break
+
+
+def measure(
+    fn: Callable,
+    *args: object,
+    repeat: int = 1,
+    memory: bool = True,
+) -> tuple[Any, float, int | None]:
+    """(result, best wall time of repeat runs, peak traced bytes).
+    Memory is traced in one extra run so tracing does not skew timings."""
+    best = float("inf")
+    result = None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            fn(*args)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result, best, peak
+
+
+def run_benchmarks(
+    sizes: Iterable[int] = DEFAULT_SIZES,
+    budgets: Iterable[int] = DEFAULT_BUDGETS,
+    *,
+    solvers: Sequence[str] | None = None,
+    source: str = "data.csv",
+    seed: int = 0,
+    repeat: int = 1,
+    memory: bool = True,
+    workdir: str | None = None,
+    log: Callable[[str], None] | None = print,
+) -> dict:
+    """Times prepare_dataset and every solver per size and budget.
+    Solvers beyond their row limit are recorded as skipped."""
+    names = list(SOLVERS if solvers is None else solvers)
+    budgets = list(budgets)
+    report: dict[str, Any] = {
+        "format": REPORT_FORMAT,
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": seed,
+        },
+        "prepare": [],
+        "solvers": [],
+    }
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, f"synthetic_{n}.csv")
+            synthetic_csv(path, n, source=source, seed=seed)
+            df, secs, peak = measure(prepare_dataset, path,
+                                     repeat=repeat, memory=memory)
+            report["prepare"].append(
+                {"rows": n, "seconds": secs, "peak_bytes": peak})
+            if log:
+                log(f"prepare_dataset rows={n}: {secs:.3f}s")
+            inst = KnapsackInstance.from_frame(df)
+            del df
+
+            for W in budgets:
+                best_score: float | None = None
+                rows: list[dict[str, Any]] = []
+                for name in names:
+                    fn, limit = SOLVERS[name]
+                    entry: dict[str, Any] = {"rows": n, "budget": W,
+                                             "solver": name}
+                    too_big = limit is not None and len(inst) > limit
+                    if name == "dynamic_programming":
+                        too_big |= len(inst) * (W + 1) > DP_MAX_CELLS
+                    if too_big:
+                        entry["skipped"] = True
+                        rows.append(entry)
+                        continue
+                    (choice, score, weight), secs, peak = measure(
+                        fn, inst, W, repeat=repeat, memory=memory)
+                    entry.update(seconds=secs, peak_bytes=peak,
+                                 score=float(score), weight=int(weight),
+                                 selected=len(choice))
+                    if best_score is None or score > best_score:
+                        best_score = float(score)
+                    rows.append(entry)
+                    if log:
+                        log(f"{name} rows={n} W={W}: {secs:.3f}s "
+                            f"score={score}")
+                # quality relative to the best solver on the same instance
+                for entry in rows:
+                    if "score" in entry:
+                        entry["quality"] = (entry["score"] / best_score
+                                            if best_score else 1.0)
+                report["solvers"].extend(rows)
+    return report
+
+
+def _key(entry: dict) -> tuple:
+    return (entry.get("solver", "prepare_dataset"), entry["rows"],
+            entry.get("budget"))
+
+
+def compare(
+    report: dict,
+    baseline: dict,
+    *,
+    time_tolerance: float = 0.25,
+    memory_tolerance: float = 0.25,
+    quality_tolerance: float = 1e-9,
+    min_seconds: float = 0.01,
+) -> list[dict]:
+    """Regressions of report against baseline: runs more than
+    time_tolerance slower (ignoring runs under min_seconds), peaks more
+    than memory_tolerance larger, and lower scores."""
+    base = {_key(e): e for e in baseline["prepare"] + baseline["solvers"]}
+    found = []
+    for entry in report["prepare"] + report["solvers"]:
+        old = base.get(_key(entry))
+        if old is None or entry.get("skipped") or old.get("skipped"):
+            continue
+        name, rows, budget = _key(entry)
+        where = {"name": name, "rows": rows, "budget": budget}
+        if (max(entry["seconds"], old["seconds"]) >= min_seconds
+                and entry["seconds"] > old["seconds"] * (1 + time_tolerance)):
+            found.append(dict(where, metric="seconds",
+                              baseline=old["seconds"], value=entry["seconds"]))
+        if (entry.get("peak_bytes") and old.get("peak_bytes")
+                and entry["peak_bytes"]
+                > old["peak_bytes"] * (1 + memory_tolerance)):
+            found.append(dict(where, metric="peak_bytes",
+                              baseline=old["peak_bytes"],
+                              value=entry["peak_bytes"]))
+        if ("score" in entry and "score" in old
+                and entry["score"] < old["score"] - quality_tolerance):
+            found.append(dict(where, metric="score",
+                              baseline=old["score"], value=entry["score"]))
+    return found
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=list(DEFAULT_SIZES))
+    parser.add_argument("--budgets", type=int, nargs="+",
+                        default=list(DEFAULT_BUDGETS))
+    parser.add_argument("--solvers", nargs="+", choices=list(SOLVERS))
+    parser.add_argument("--source", default="data.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the tracemalloc run")
+    parser.add_argument("--out", default="benchmark_report.json")
+    parser.add_argument("--baseline",
+                        help="compare against this report, exit 1 on "
+                             "regressions")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="write the report to --baseline instead")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        args.sizes, args.budgets, solvers=args.solvers, source=args.source,
+        seed=args.seed, repeat=args.repeat, memory=not args.no_memory)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if args.baseline is None:
+        return 0
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(report, baseline, time_tolerance=args.tolerance,
+                          memory_tolerance=args.tolerance)
+    for reg in regressions:
+        print(f"REGRESSION {reg['name']} rows={reg['rows']} "
+              f"budget={reg['budget']} {reg['metric']}: "
+              f"{reg['baseline']} -> {reg['value']}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
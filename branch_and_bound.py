@@ -0,0 +1,144 @@
+"""Branch and bound for the 0-1 knapsack problem (women)."""
+from __future__ import annotations
+from collections.abc import Hashable, Iterable
+from typing import TYPE_CHECKING, List, Tuple
+import math
+import time
+import numpy as np
+from instance import KnapsackInstance, as_instance
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def fractional_bound(
+    k: int,
+    cap: int,
+    prefix_w: np.ndarray,
+    prefix_s: np.ndarray,
+    ratios: np.ndarray,
+) -> float:
+    """Dantzig bound: items k.. in ratio order taken whole while they fit,
+    then a fraction of the first one that does not."""
+    m = int(np.searchsorted(prefix_w, prefix_w[k] + cap, side="right")) - 1
+    bound = prefix_s[m] - prefix_s[k]
+    if m < len(ratios):
+        bound += (cap - (prefix_w[m] - prefix_w[k])) * ratios[m]
+    return float(bound)
+
+
+def branch_and_bound_search(
+    df: pd.DataFrame | KnapsackInstance,
+    max_weight: int,
+    *,
+    incumbent: Iterable[Hashable] | None = None,
+    node_limit: int | None = None,
+    time_limit: float | None = None,
+) -> Tuple[List[Hashable], float, int, float]:
+    """Depth-first branch and bound with the Dantzig (LP) bound.
+    Items are presorted by risk_score/weight as in greedy.py. The search
+    starts from incumbent (e.g. a greedy_approach choice; its items with
+    non-positive score are left out) or from a greedy fill, and stops
+    early at node_limit nodes or time_limit seconds.
+    Returns (choice, score, weight, gap) where gap is how much the optimum
+    may still exceed score (0.0 when the search finished)."""
+    started = time.perf_counter()
+    inst = as_instance(df)
+    w_all, r_all = inst.weights, inst.scores
+    if (w_all <= 0).any():
+        raise ValueError("branch_and_bound needs positive weights")
+
+    cand = np.flatnonzero((r_all > 0) & (w_all <= max_weight))
+    ratio = r_all[cand] / w_all[cand]
+    order = cand[np.lexsort((w_all[cand], -r_all[cand], -ratio))]
+    w = w_all[order]
+    r = r_all[order]
+    ratios = r / w
+    prefix_w = np.concatenate(([0], np.cumsum(w)))
+    prefix_s = np.concatenate(([0.0], np.cumsum(r)))
+    integral = bool(np.all(r == np.floor(r)))
+    n = len(order)
+    wl, rl = w.tolist(), r.tolist()
+    # identical items are adjacent after the sort; once one is left out,
+    # taking a later copy instead would only repeat the same subtree
+    new_class = np.flatnonzero(np.r_[True, (w[1:] != w[:-1])
+                                     | (r[1:] != r[:-1]), True])
+    next_class = np.repeat(new_class[1:],
+                           np.diff(new_class)).tolist() if n else []
+
+    if incumbent is not None:
+        best_pos = inst.positions(incumbent)
+        if int(w_all[best_pos].sum()) > max_weight:
+            raise ValueError("incumbent exceeds max_weight")
+        # the search only builds selections of positive items; dropping
+        # the others can only help, and keeps best_s at least 0 (empty)
+        best_pos = [j for j in best_pos if r_all[j] > 0]
+    else:
+        best_pos, cap = [], max_weight
+        for j, wj in zip(order.tolist(), wl):
+            if wj <= cap:
+                best_pos.append(j)
+                cap -= wj
+    best_s = float(r_all[best_pos].sum()) if best_pos else 0.0
+
+    def bound(k: int, cap: int, val: float) -> float:
+        b = val + fractional_bound(k, cap, prefix_w, prefix_s, ratios)
+        return math.floor(b + 1e-9) if integral else b
+
+    # nodes: (next item, remaining capacity, score, taken path as cons list)
+    stack: list[tuple[int, int, float, tuple | None]] = [
+        (0, int(max_weight), 0.0, None)]
+    nodes = 0
+    while stack:
+        if node_limit is not None and nodes >= node_limit:
+            break
+        if (time_limit is not None and nodes % 1024 == 0
+                and time.perf_counter() - started >= time_limit):
+            break
+        k, cap, val, path = stack.pop()
+        nodes += 1
+        # skip items that no longer fit; they only have the exclude branch
+        while k < n and wl[k] > cap:
+            k += 1
+        if k >= n or bound(k, cap, val) <= best_s:
+            continue
+
+        stack.append((next_class[k], cap, val, path))
+        val_in = val + rl[k]
+        path_in = (k, path)
+        if val_in > best_s:
+            best_s = val_in
+            best_pos = []
+            p: tuple | None = path_in
+            while p is not None:
+                best_pos.append(int(order[p[0]]))
+                p = p[1]
+            best_pos.reverse()
+        stack.append((k + 1, cap - wl[k], val_in, path_in))
+
+    gap = 0.0
+    if stack:
+        gap = max(bound(min(k, n), cap, val) for k, cap, val, _ in stack)
+        gap = max(0.0, gap - best_s)
+
+    choice: List[Hashable] = inst.to_labels(best_pos)
+    total_w = int(w_all[best_pos].sum()) if best_pos else 0
+    return choice, best_s, total_w, float(gap)
+
+
+def branch_and_bound(
+    df: pd.DataFrame | KnapsackInstance,
+    max_weight: int,
+    *,
+    incumbent: Iterable[Hashable] | None = None,
+    node_limit: int | None = None,
+    time_limit: float | None = None,
+) -> Tuple[List[Hashable], float, int]:
+    """Branch and bound for 0-1 knapsack problem (women).
+    Returns (choice, score, weight); see branch_and_bound_search for
+    the remaining optimality gap."""
+    choice, score, weight, _ = branch_and_bound_search(
+        df, max_weight,
+        incumbent=incumbent, node_limit=node_limit, time_limit=time_limit,
+    )
+    return choice, score, weight
@@ -0,0 +1,225 @@
+"""On-disk columnar cache of the prepared dataset."""
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+import data
+import scoring
+
+CACHE_DIR = ".cache/prepared"
+CACHE_FORMAT = 2
+SCORE_DTYPE = np.int16
+CODE_DTYPE = np.int32
+META = "meta.json"
+
+
+def source_fingerprint(path: str) -> str:
+    """Cache key: file contents, scoring rules and the cleaning and
+    scoring code that turns the file into the prepared frame."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    h.update(scoring.rules_fingerprint().encode())
+    for fn in (data.iter_clean_data, data.clean_frame,
+               data.categorize_income, data.iter_prepared_dataset,
+               scoring.score_frame, scoring.score_codes,
+               scoring.column_points):
+        h.update(inspect.getsource(fn).encode())
+    h.update(str(CACHE_FORMAT).encode())
+    return h.hexdigest()
+
+
+def _column_file(entry: str, i: int) -> str:
+    return os.path.join(entry, f"col{i}.bin")
+
+
+def _promote(file: str, dtype: np.dtype, new_dtype: np.dtype) -> None:
+    """Rewrites an already written column file with a wider dtype."""
+    old = np.fromfile(file, dtype=dtype)
+    old.astype(new_dtype).tofile(file)
+
+
+def _category_codes(codes: np.ndarray, uniques: list,
+                    vocab: dict[object, int]) -> np.ndarray:
+    """Chunk-local factorize codes mapped to codes of the whole column."""
+    lut = np.array([vocab.setdefault(u, len(vocab)) for u in uniques]
+                   + [-1], dtype=CODE_DTYPE)
+    return lut[codes]
+
+
+def _recode(file: str, dtype: np.dtype, vocab: dict[object, int]) -> None:
+    """Rewrites an already written numeric column file as category codes,
+    for a column that turns out to hold strings in a later chunk."""
+    codes, uniques = pd.factorize(np.fromfile(file, dtype=dtype))
+    _category_codes(codes, uniques.tolist(), vocab).tofile(file)
+
+
+def write_cache(path: str, entry: str, chunksize: int = 100_000) -> None:
+    """Streams the prepared dataset into entry as one raw file per column.
+    Object columns become int32 category codes, risk_score and weight
+    int16, other numeric columns keep their dtype (widened when a later
+    chunk needs it, and turned into category codes when a later chunk
+    holds strings). The frame's dtype of each column is kept in the meta
+    file, so read_cache can return the dtypes prepare_dataset does."""
+    columns: list[dict] | None = None
+    vocab: list[dict[object, int]] = []
+    dtype: np.dtype
+    rows = 0
+    os.makedirs(entry)
+    index_file = open(os.path.join(entry, "index.bin"), "wb")
+    try:
+        for chunk in data.iter_prepared_dataset(path, chunksize):
+            if columns is None:
+                columns = []
+                for name in chunk.columns:
+                    series = chunk[name]
+                    if name in ("risk_score", "weight"):
+                        kind, dtype = "score", np.dtype(SCORE_DTYPE)
+                    elif pd.api.types.is_numeric_dtype(series):
+                        kind, dtype = "numeric", series.dtype
+                    else:
+                        kind, dtype = "category", np.dtype(CODE_DTYPE)
+                    columns.append({"name": name, "kind": kind,
+                                    "dtype": dtype.str,
+                                    "frame_dtype": str(series.dtype)})
+                    vocab.append({})
+
+            np.asarray(chunk.index, dtype=np.int64).tofile(index_file)
+            for i, col in enumerate(columns):
+                series = chunk[col["name"]]
+                dtype = np.dtype(col["dtype"])
+                if col["kind"] == "numeric":
+                    values = series.to_numpy()
+                    new_dtype = np.result_type(dtype, values.dtype)
+                    if new_dtype == object:
+                        _recode(_column_file(entry, i), dtype, vocab[i])
+                        col["kind"] = "category"
+                        col["dtype"] = np.dtype(CODE_DTYPE).str
+                        col["frame_dtype"] = str(series.dtype)
+                    elif new_dtype != dtype:
+                        _promote(_column_file(entry, i), dtype, new_dtype)
+                        col["dtype"] = new_dtype.str
+                        col["frame_dtype"] = new_dtype.str
+                    values = values.astype(new_dtype)
+                if col["kind"] == "category":
+                    codes, uniques = series.factorize()
+                    values = _category_codes(codes, list(uniques), vocab[i])
+                elif col["kind"] == "score":
+                    values = series.to_numpy()
+                    info = np.iinfo(SCORE_DTYPE)
+                    if len(values) and (values.min() < info.min
+                                        or values.max() > info.max):
+                        raise ValueError(
+                            f"{col['name']} does not fit in {dtype}")
+                    values = values.astype(SCORE_DTYPE)
+                with open(_column_file(entry, i), "ab") as f:
+                    values.tofile(f)
+            rows += len(chunk)
+    finally:
+        index_file.close()
+
+    for i, col in enumerate(columns or []):
+        if col["kind"] == "category":
+            col["categories"] = list(vocab[i])
+    meta = {"format": CACHE_FORMAT, "rows": rows, "columns": columns or []}
+    with open(os.path.join(entry, META), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def read_cache(entry: str) -> pd.DataFrame:
+    """Loads a cache entry with prepare_dataset's dtypes. Numeric columns
+    and the index stay memory-mapped and read-only; text columns are
+    rebuilt from their category codes and risk_score and weight widened
+    from int16, so those are ordinary in-memory copies."""
+    with open(os.path.join(entry, META), encoding="utf-8") as f:
+        meta = json.load(f)
+
+    def mapped(file: str, dtype: str) -> np.ndarray:
+        if meta["rows"] == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(file, dtype=dtype, mode="r",
+                         shape=(meta["rows"],)).view(np.ndarray)
+
+    cols: dict[str, object] = {}
+    for i, col in enumerate(meta["columns"]):
+        values = mapped(_column_file(entry, i), col["dtype"])
+        dtype = pd.api.types.pandas_dtype(col["frame_dtype"])
+        if col["kind"] == "category":
+            cols[col["name"]] = pd.Categorical.from_codes(
+                values, categories=col["categories"]).astype(dtype)
+        else:
+            # no copy when the stored dtype already is the frame's
+            cols[col["name"]] = values.astype(dtype, copy=False)
+    index = pd.Index(mapped(os.path.join(entry, "index.bin"), "<i8"))
+    os.utime(os.path.join(entry, META))
+    return pd.DataFrame(cols, index=index, copy=False)
+
+
+def evict(
+    cache_dir: str = CACHE_DIR,
+    *,
+    max_bytes: int | None = None,
+    max_age: float | None = None,
+    keep: str | None = None,
+) -> None:
+    """Removes entries unused for max_age seconds, then least recently used
+    ones until the cache fits in max_bytes. The entry named keep stays."""
+    if not os.path.isdir(cache_dir):
+        return
+    entries = []
+    for name in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, name)
+        meta = os.path.join(entry, META)
+        if not os.path.isfile(meta):
+            continue
+        size = sum(e.stat().st_size for e in os.scandir(entry))
+        entries.append((os.stat(meta).st_mtime, size, name, entry))
+    entries.sort()
+
+    now = time.time()
+    total = sum(e[1] for e in entries)
+    for used, size, name, entry in entries:
+        if name == keep:
+            continue
+        too_old = max_age is not None and now - used > max_age
+        too_big = max_bytes is not None and total > max_bytes
+        if too_old or too_big:
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+
+def prepare_dataset_cached(
+    path: str,
+    cache_dir: str = CACHE_DIR,
+    *,
+    chunksize: int = 100_000,
+    max_bytes: int | None = 1 << 30,
+    max_age: float | None = 30 * 24 * 3600.0,
+) -> pd.DataFrame:
+    """prepare_dataset with an on-disk cache keyed by source_fingerprint.
+    Warm runs read the stored columns instead of rebuilding them (see
+    read_cache for which stay memory-mapped and read-only)."""
+    key = source_fingerprint(path)
+    entry = os.path.join(cache_dir, key)
+
+    if not os.path.isfile(os.path.join(entry, META)):
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{entry}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        try:
+            write_cache(path, tmp, chunksize)
+            os.replace(tmp, entry)
+        except OSError:
+            # another process published the same entry first
+            if not os.path.isfile(os.path.join(entry, META)):
+                raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        evict(cache_dir, max_bytes=max_bytes, max_age=max_age, keep=key)
+
+    return read_cache(entry)
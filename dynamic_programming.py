@@ -0,0 +1,117 @@
+"""Exact dynamic programming for the 0-1 knapsack problem (women)."""
+from __future__ import annotations
+from collections.abc import Hashable
+from typing import TYPE_CHECKING, List, Tuple
+import numpy as np
+from instance import KnapsackInstance, as_instance
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def dp_table(
+    weights: np.ndarray,
+    scores: np.ndarray,
+    max_weight: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Row-vectorized DP over capacities 0..max_weight.
+    Returns the best score per capacity, the positions that can ever be
+    taken (positive score, weight within capacity) and their bit-packed
+    keep table: bit c of row k is set when item k is taken at capacity c."""
+    cap = max(int(max_weight), 0)
+    items = np.flatnonzero((scores > 0) & (weights <= cap))
+    best = np.zeros(cap + 1, dtype=np.float64)
+    keep = np.zeros((len(items), (cap + 8) // 8), dtype=np.uint8)
+    row = np.zeros(cap + 1, dtype=bool)
+
+    for k, (wk, rk) in enumerate(zip(weights[items].tolist(),
+                                     scores[items].tolist())):
+        cand = best[: cap + 1 - wk] + rk
+        take = cand > best[wk:]
+        if not take.any():
+            continue
+        best[wk:] = np.where(take, cand, best[wk:])
+        row[:wk] = False
+        row[wk:] = take
+        keep[k] = np.packbits(row)
+
+    return best, items, keep
+
+
+def dp_backtrack(
+    keep: np.ndarray,
+    items: np.ndarray,
+    weights: np.ndarray,
+    capacity: int,
+) -> list[int]:
+    """Positions chosen by the DP at the given capacity."""
+    chosen = []
+    c = int(capacity)
+    for k in range(len(items) - 1, -1, -1):
+        if keep[k, c >> 3] & (0x80 >> (c & 7)):
+            j = int(items[k])
+            chosen.append(j)
+            c -= int(weights[j])
+    chosen.reverse()
+    return chosen
+
+
+class CapacityFrontier:
+    """Optimal score for every budget 0..max_weight from one DP run.
+    scores[c] is the best score within budget c and marginal[c] what
+    budget c adds over c - 1."""
+
+    __slots__ = ("scores", "marginal", "_inst", "_items", "_keep")
+
+    def __init__(self, inst: KnapsackInstance, max_weight: int) -> None:
+        if (inst.weights < 0).any():
+            raise ValueError("dynamic_programming needs non-negative weights")
+        self._inst = inst
+        self.scores, self._items, self._keep = dp_table(
+            inst.weights, inst.scores, max_weight)
+        self.marginal = np.diff(self.scores, prepend=0.0)
+
+    @property
+    def max_weight(self) -> int:
+        """Largest budget covered."""
+        return len(self.scores) - 1
+
+    def budget_for(self, score: float) -> int | None:
+        """Smallest budget whose optimum reaches score (None if none does)."""
+        c = int(np.searchsorted(self.scores, score, side="left"))
+        return c if c <= self.max_weight else None
+
+    def select(self, budget: int) -> Tuple[List[Hashable], float, int]:
+        """Optimal (choice, score, weight) for budget; among optimal
+        selections one of least weight."""
+        if not 0 <= budget <= self.max_weight:
+            raise ValueError(f"budget must be in 0..{self.max_weight}")
+        # smallest capacity that already reaches the optimum
+        capacity = int(np.argmax(self.scores[: budget + 1]
+                                 == self.scores[budget]))
+        inst = self._inst
+        pos = dp_backtrack(self._keep, self._items, inst.weights, capacity)
+        choice: List[Hashable] = inst.to_labels(pos)
+        total_s = float(inst.scores[pos].sum()) if pos else 0.0
+        total_w = int(inst.weights[pos].sum()) if pos else 0
+        return choice, total_s, total_w
+
+
+def capacity_frontier(
+    df: pd.DataFrame | KnapsackInstance,
+    max_weight: int,
+) -> CapacityFrontier:
+    """Budget frontier: optimum and marginal gain for every capacity up to
+    max_weight; selections are backtracked on demand with select()."""
+    return CapacityFrontier(as_instance(df), max_weight)
+
+
+def dynamic_programming(
+    df: pd.DataFrame | KnapsackInstance,
+    max_weight: int,
+) -> Tuple[List[Hashable], float, int]:
+    """Exact 0-1 knapsack by dynamic programming over capacities.
+    Among optimal selections it returns one of least weight.
+    Returns (choice, score, weight)."""
+    frontier = capacity_frontier(df, max_weight)
+    return frontier.select(frontier.max_weight)
@@ -0,0 +1,108 @@
+"""Scoring selections against the 'Violence' column."""
+from collections.abc import Hashable, Iterable, Sequence
+import numpy as np
+import pandas as pd
+
+
+class SelectionEvaluator:
+    """The yes/no label of every row as one boolean array, computed once.
+    Selections are mapped to row positions and scored with array sums;
+    the numbers match all_test.evaluate_selection and yes_at_k."""
+
+    __slots__ = ("index", "yes", "base_yes", "n")
+
+    def __init__(self, data: pd.DataFrame, column: str = "Violence") -> None:
+        if column not in data.columns:
+            raise KeyError(column)
+        self.index = data.index
+        self.yes = (data[column].astype(str).str.lower() == "yes").to_numpy()
+        self.base_yes = int(self.yes.sum())
+        self.n = len(data)
+
+    def positions(self, choice: Iterable[Hashable]) -> np.ndarray:
+        """Row positions of the given labels (KeyError for unknown ones)."""
+        labels = list(choice)
+        if not labels:
+            return np.empty(0, dtype=np.int64)
+        pos = self.index.get_indexer(labels)
+        if (pos < 0).any():
+            missing = [lab for lab, p in zip(labels, pos) if p < 0]
+            raise KeyError(missing)
+        return pos
+
+    def _report(self, selected: int, selected_yes: int) -> dict:
+        base_yes = self.base_yes
+        precision = selected_yes / selected if selected else 0.0
+        recall = selected_yes / base_yes if base_yes else 0.0
+        base_rate = base_yes / self.n if self.n else 0.0
+        lift = (precision / base_rate) if base_rate > 0 else 0.0
+        return {
+            "selected": selected,
+            "selected_yes": selected_yes,
+            "base_yes": base_yes,
+            "precision": precision,
+            "recall": recall,
+            "lift": lift,
+            "base_rate": base_rate,
+        }
+
+    def evaluate(self, choice: Iterable[Hashable]) -> dict:
+        """Precision, recall and lift of one selection."""
+        pos = self.positions(choice)
+        return self._report(len(pos), int(self.yes[pos].sum()))
+
+    def evaluate_positions(
+        self,
+        positions: np.ndarray,
+        offsets: Sequence[int] | np.ndarray | None = None,
+    ) -> list[dict]:
+        """Scores many selections given as positions at once.
+        positions is either a 2-D array with one selection per row (-1
+        pads shorter rows) or a flat array cut into selections at offsets
+        (offsets[i]:offsets[i + 1], like a CSR layout)."""
+        positions = np.asarray(positions, dtype=np.int64)
+        if offsets is None:
+            valid = positions >= 0
+            sizes = valid.sum(axis=1)
+            hits = (self.yes[np.where(valid, positions, 0)] & valid).sum(
+                axis=1)
+        else:
+            offsets = np.asarray(offsets, dtype=np.int64)
+            sizes = np.diff(offsets)
+            # prefix sums over the concatenation give every segment's count
+            csum = np.concatenate(([0], np.cumsum(self.yes[positions])))
+            hits = csum[offsets[1:]] - csum[offsets[:-1]]
+        return [self._report(int(s), int(h)) for s, h in zip(sizes, hits)]
+
+    def evaluate_many(
+        self,
+        choices: Iterable[Iterable[Hashable]],
+    ) -> list[dict]:
+        """evaluate for each selection, with one label lookup overall."""
+        chunks = [list(c) for c in choices]
+        offsets = np.concatenate(
+            ([0], np.cumsum([len(c) for c in chunks]))).astype(np.int64)
+        flat = [lab for c in chunks for lab in c]
+        return self.evaluate_positions(self.positions(flat), offsets)
+
+    def yes_curve(self, choice: Iterable[Hashable]) -> np.ndarray:
+        """Number of 'yes' rows among the first k selected, for every k
+        (entry k - 1)."""
+        return np.cumsum(self.yes[self.positions(choice)])
+
+    def yes_at_k(
+        self,
+        choice: Iterable[Hashable],
+        ks: Iterable[int] = (10, 15, 25),
+    ) -> dict:
+        """Count 'yes' in the top-k selected, for all ks from one cumsum."""
+        curve = self.yes_curve(choice)
+        out = {}
+        for k in ks:
+            m = len(range(len(curve))[:k])  # len(choice[:k])
+            if not m:
+                out[k] = {"yes": 0, "rate": 0.0}
+                continue
+            cnt = int(curve[m - 1])
+            out[k] = {"yes": cnt, "rate": cnt / m}
+        return out
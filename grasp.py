@@ -1,9 +1,20 @@
 """ GRASP algorithm """
-from collections.abc import Hashable
-from typing import List, Tuple
+from __future__ import annotations
+from collections import deque
+from collections.abc import Hashable, Iterable, Iterator, Sequence
+from typing import TYPE_CHECKING, Any, List, Tuple
+from concurrent.futures import Future, ProcessPoolExecutor
+import math
 import random
-import pandas as pd
-from local_search import local_search_first_improvement
+import time
+import numpy as np
+from instance import KnapsackInstance, as_instance, deadline_after
+from instrumentation import SolverStats
+from local_search import local_search_positions
+from shared import WORKER, instance_pool, pool_workers
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 def ratio_val(rj: float, wj: int, alpha: float, lambda_w: float) -> float:
@@ -12,7 +23,7 @@ def ratio_val(rj: float, wj: int, alpha: float, lambda_w: float) -> float:
 
 
 def grasp_construct(
-    df: pd.DataFrame,
+    df: pd.DataFrame | KnapsackInstance,
     max_weight: int,
     rn: random.Random,
     *,
@@ -21,37 +32,209 @@ def grasp_construct(
     lambda_w: float = 0.5,
 ) -> tuple[list[Hashable], float, int]:
     """GRASP construction phase."""
-    w = df["weight"].astype(int).to_dict()
-    r = df["risk_score"].astype(float).to_dict()
-    ids_all: list[Hashable] = list(df.index)
+    inst = as_instance(df)
+    chosen, ts, tw = grasp_construct_positions(
+        inst.weights.tolist(), inst.scores.tolist(), max_weight, rn,
+        rcl_size=rcl_size, alpha=alpha, lambda_w=lambda_w,
+    )
+    return inst.to_labels(chosen), ts, tw
+
+
+def construction_order(
+    w: Sequence[int] | np.ndarray,
+    r: Sequence[float] | np.ndarray,
+    max_weight: int,
+    alpha: float = 0.9,
+    lambda_w: float = 0.5,
+) -> list[int]:
+    """Candidates (positive score, weight within max_weight) by ratio_val
+    desc, ties by position. Computed once and reused by every construction."""
+    w_arr, r_arr = np.asarray(w), np.asarray(r, dtype=np.float64)
+    cand = np.flatnonzero((r_arr > 0) & (w_arr <= max_weight))
+    keys = r_arr[cand] / ((np.maximum(w_arr[cand], 1) + lambda_w) ** alpha)
+    return cand[np.argsort(-keys, kind="stable")].tolist()
+
+
+def grasp_construct_positions(
+    w: list[int],
+    r: list[float],
+    max_weight: int,
+    rn: random.Random,
+    *,
+    rcl_size: int = 20,
+    alpha: float = 0.9,
+    lambda_w: float = 0.5,
+    order: list[int] | None = None,
+) -> tuple[list[int], float, int]:
+    """grasp_construct over item positions.
+    Walks the presorted order and takes the first rcl_size items that are
+    not taken and still fit as the RCL. Capacity only shrinks, so items that
+    no longer fit are dropped for good; nxt[k] points at the next slot that
+    may be alive (path-compressed), which makes skipping them cheap."""
+    if order is None:
+        order = construction_order(w, r, max_weight, alpha, lambda_w)
+    m = len(order)
+    nxt = list(range(m + 1))
+    rcl_size = max(1, rcl_size)
+
+    def alive(k: int) -> int:
+        root = k
+        while nxt[root] != root:
+            root = nxt[root]
+        while nxt[k] != root:
+            nxt[k], k = root, nxt[k]
+        return root
 
-    chosen: list[Hashable] = []
+    chosen: list[int] = []
     tw, ts = 0, 0.0
-    remaining = set(ids_all)
 
     while True:
-        feasible = [j for j in remaining if r[j] > 0
-                    and (tw + w[j] <= max_weight)]
-        if not feasible:
+        rcl: list[int] = []
+        k = alive(0)
+        while k < m and len(rcl) < rcl_size:
+            if tw + w[order[k]] <= max_weight:
+                rcl.append(k)
+            else:
+                nxt[k] = k + 1
+            k = alive(k + 1)
+        if not rcl:
             break
 
-        feasible.sort(
-            key=lambda j: ratio_val(r[j], w[j], alpha, lambda_w),
-            reverse=True,
-        )
-        rcl = feasible[: max(1, rcl_size)]
-        j = rn.choice(rcl)
-
+        k = rn.choice(rcl)
+        nxt[k] = k + 1
+        j = order[k]
         chosen.append(j)
         tw += w[j]
         ts += r[j]
-        remaining.remove(j)
 
     return chosen, ts, tw
 
 
+def iteration_rng(seed: int, it: int) -> random.Random:
+    """Independent generator for GRASP iteration it, derived from seed,
+    so results do not depend on how iterations are spread over workers."""
+    return random.Random(f"grasp:{seed}:{it}")
+
+
+def grasp_iteration(
+    w: list[int],
+    r: list[float],
+    max_weight: int,
+    seed: int,
+    it: int,
+    *,
+    rcl_size: int = 20,
+    alpha: float = 0.9,
+    lambda_w: float = 0.5,
+    ls_imp: int = 2,
+    order: list[int] | None = None,
+    stats: SolverStats | None = None,
+    deadline: float | None = None,
+) -> tuple[list[int], float, int]:
+    """One construction plus local search, over item positions.
+    With stats, times both phases (grasp.construct, ls.total); the local
+    search stops at deadline (a time.monotonic() value)."""
+    rn = iteration_rng(seed, it)
+    t0 = time.perf_counter()
+    c0, _, _ = grasp_construct_positions(
+        w, r, max_weight, rn,
+        rcl_size=rcl_size, alpha=alpha, lambda_w=lambda_w, order=order,
+    )
+    if stats is not None:
+        stats.add_time("grasp.construct", time.perf_counter() - t0)
+    return local_search_positions(
+        w, r, max_weight,
+        start=c0,
+        max_no_improve=ls_imp,
+        alpha=alpha, lambda_w=lambda_w,
+        rn=rn, stats=stats, deadline=deadline,
+    )
+
+
+def _worker_iteration(
+    it: int,
+) -> tuple[list[int], float, int, dict | None] | None:
+    # monotonic time is system-wide, so the parent's deadline holds here
+    # (weights, scores and the construction order are memoryviews of
+    # the published instance, so nothing is copied or sorted per worker)
+    deadline = WORKER["deadline"]
+    if deadline is not None and time.monotonic() > deadline:
+        return None
+    # worker stats go back as plain counters/timers and are merged in order
+    stats = (SolverStats(record_events=False) if WORKER["instrument"]
+             else None)
+    c, s, w = grasp_iteration(
+        WORKER["weights"], WORKER["scores"], WORKER["max_weight"],
+        WORKER["seed"], it, order=WORKER["order"], stats=stats,
+        deadline=deadline, **WORKER["params"],
+    )
+    return c, s, w, None if stats is None else stats.to_dict()
+
+
+def _worker_batch(
+    task: tuple[int, int],
+) -> list[tuple[list[int], float, int, dict | None] | None]:
+    start, stop = task
+    return [_worker_iteration(it) for it in range(start, stop)]
+
+
+def _pool_results(
+    pool: ProcessPoolExecutor,
+    iterations: int,
+    workers: int,
+    deadline: float | None,
+) -> Iterator[tuple[int, tuple | None]]:
+    """(iteration, result) in iteration order from the pool. Only a few
+    small batches are in flight at a time: none is submitted after the
+    deadline and queued ones are cancelled then, so the run ends right
+    after it, and results come back while the run goes on."""
+    batch = max(1, min(iterations // (4 * workers), 32))
+    pending: deque[tuple[int, Future]] = deque()
+    start = 0
+    try:
+        while True:
+            expired = deadline is not None and time.monotonic() > deadline
+            while (not expired and start < iterations
+                   and len(pending) < 2 * workers):
+                stop = min(start + batch, iterations)
+                pending.append(
+                    (start, pool.submit(_worker_batch, (start, stop))))
+                start = stop
+            if not pending:
+                return
+            first, fut = pending.popleft()
+            if fut.cancelled():
+                continue
+            yield from enumerate(fut.result(), first)
+            if deadline is not None and time.monotonic() > deadline:
+                for _, queued in pending:
+                    queued.cancel()
+    finally:
+        # also when the caller stops early: nothing queued runs after that
+        for _, queued in pending:
+            queued.cancel()
+
+
+def greedy_fill(
+    w: Sequence[int],
+    r: Sequence[float],
+    max_weight: int,
+    order: Sequence[int],
+) -> tuple[list[int], float, int]:
+    """Candidates taken in construction order while they fit: the
+    incumbent before any iteration has finished."""
+    chosen: list[int] = []
+    tw, ts = 0, 0.0
+    for j in order:
+        if tw + w[j] <= max_weight:
+            chosen.append(j)
+            tw += w[j]
+            ts += r[j]
+    return chosen, ts, tw
+
+
 def grasp(
-    df: pd.DataFrame,
+    df: pd.DataFrame | KnapsackInstance,
     max_weight: int,
     *,
     iterations: int = 50,
@@ -60,31 +243,147 @@ def grasp(
     alpha: float = 0.9,
     lambda_w: float = 0.5,
     ls_imp: int = 2,
+    workers: int | None = None,
+    stats: SolverStats | None = None,
+    time_limit: float | None = None,
+    mmap_path: str | None = None,
 ) -> Tuple[List[Hashable], float, int]:
     """GRASP algorithm with local search.Uses first-improvement local search.
-    Returns the best solution found (choice, score, weight)."""
+    Each iteration draws from its own generator derived from seed, so with
+    workers > 1 (a process pool attached to a shared-memory copy of the
+    instance) the result is the same as the serial run.
+    stats (optional) gets phase timers, local search counters and one
+    grasp.iteration event per iteration; workers send back counters and
+    timers only. With time_limit (seconds) no iteration starts after the
+    deadline and a running local search stops there. mmap_path publishes
+    the instance to workers as a memory-mapped file instead of a
+    shared-memory block.
+    Returns the best solution found (choice, score, weight). With
+    time_limit the greedy fill of the construction order (greedy_fill) is
+    the incumbent until an iteration beats it, so an early deadline still
+    gives a feasible one; without it the result is the best iteration."""
+    inst = as_instance(df)
+    best: tuple[list[int], float, int] = ([], 0.0, 0)
+    for best in _grasp_incumbents(inst, max_weight, iterations, seed,
+                                  rcl_size, alpha, lambda_w, ls_imp,
+                                  workers, stats,
+                                  deadline_after(time_limit), mmap_path):
+        pass
+    best_choice, best_s, best_w = best
+    return inst.to_labels(best_choice), best_s, best_w
+
+
+def iter_grasp(
+    df: pd.DataFrame | KnapsackInstance,
+    max_weight: int,
+    *,
+    iterations: int = 50,
+    seed: int = 42,
+    rcl_size: int = 20,
+    alpha: float = 0.9,
+    lambda_w: float = 0.5,
+    ls_imp: int = 2,
+    workers: int | None = None,
+    stats: SolverStats | None = None,
+    time_limit: float | None = None,
+    mmap_path: str | None = None,
+) -> Iterator[Tuple[List[Hashable], float, int]]:
+    """grasp as a generator: yields the greedy fill, then every new
+    incumbent (choice, score, weight) in iteration order, as soon as it
+    is found. The last one yielded is what grasp
+    returns."""
+    inst = as_instance(df)
+    for c, s, w in _grasp_incumbents(inst, max_weight, iterations, seed,
+                                     rcl_size, alpha, lambda_w, ls_imp,
+                                     workers, stats,
+                                     deadline_after(time_limit),
+                                     mmap_path):
+        yield inst.to_labels(c), s, w
+
+
+def _grasp_incumbents(
+    inst: KnapsackInstance,
+    max_weight: int,
+    iterations: int,
+    seed: int,
+    rcl_size: int,
+    alpha: float,
+    lambda_w: float,
+    ls_imp: int,
+    workers: int | None,
+    stats: SolverStats | None,
+    deadline: float | None,
+    mmap_path: str | None = None,
+) -> Iterator[tuple[list[int], float, int]]:
+    """Runs the iterations and yields each improved (positions, score,
+    weight)."""
+    params: dict[str, Any] = {"rcl_size": rcl_size, "alpha": alpha,
+                              "lambda_w": lambda_w, "ls_imp": ls_imp}
+
+    n_workers = pool_workers(workers, iterations)
+    if n_workers:
+        order = construction_order(inst.weights, inst.scores, max_weight,
+                                   alpha, lambda_w)
+        with instance_pool(
+            inst, n_workers, iterations,
+            {"max_weight": max_weight, "seed": seed, "params": params,
+             "instrument": stats is not None, "deadline": deadline},
+            sequences=("weights", "scores", "order"),
+            path=mmap_path, extra={"order": order},
+        ) as (pool, shared):
+            assert pool is not None and shared is not None
+            yield from _reduce_incumbents(
+                greedy_fill(shared.sequence("weights"),
+                            shared.sequence("scores"), max_weight, order),
+                _pool_results(pool, iterations, n_workers, deadline), stats,
+                keep_start=deadline is not None)
+        return
 
-    rn = random.Random(seed)
+    w_list, r_list = inst.weights.tolist(), inst.scores.tolist()
+    order = construction_order(w_list, r_list, max_weight, alpha, lambda_w)
 
-    best_choice: list[Hashable] = []
-    best_s: float = -1.0
-    best_w: int = 10**9
+    def serial() -> Iterator[tuple[int, tuple | None]]:
+        for it in range(iterations):
+            if deadline is not None and time.monotonic() > deadline:
+                return
+            yield it, (*grasp_iteration(
+                w_list, r_list, max_weight, seed, it, order=order,
+                stats=stats, deadline=deadline, **params), None)
 
-    for _ in range(iterations):
-        c0, _, _ = grasp_construct(
-            df, max_weight, rn,
-            rcl_size=rcl_size, alpha=alpha, lambda_w=lambda_w
-        )
+    yield from _reduce_incumbents(
+        greedy_fill(w_list, r_list, max_weight, order), serial(), stats,
+        keep_start=deadline is not None)
 
-        c, s, w = local_search_first_improvement(
-            df, max_weight,
-            start_choice=c0,
-            max_no_improve=ls_imp,
-            alpha=alpha, lambda_w=lambda_w,
-            rn=rn,
-        )
 
-        if (s > best_s) or (s == best_s and w < best_w):
-            best_choice, best_s, best_w = c, s, w
+def _reduce_incumbents(
+    start: tuple[list[int], float, int],
+    results: Iterable[tuple[int, tuple | None]],
+    stats: SolverStats | None,
+    keep_start: bool = True,
+) -> Iterator[tuple[list[int], float, int]]:
+    """Yields start, then every iteration result that beats the best so
+    far (higher score, or equal score and lower weight). Without
+    keep_start, start only stands in until the first iteration, which
+    replaces it whatever its score (as runs without a deadline always
+    did)."""
+    yield start
+    _, best_s, best_w = start if keep_start else ([], -math.inf, 0)
 
-    return best_choice, best_s, best_w
+    # reduce in iteration order, so ties resolve the same for any pool size
+    for it, result in results:
+        if result is None:  # skipped by a worker after the deadline
+            continue
+        c, s, w, worker_stats = result
+        improved = (s > best_s) or (s == best_s and w < best_w)
+        if improved:
+            best_s, best_w = s, w
+        if stats is not None:
+            if worker_stats is not None:
+                stats.merge(worker_stats)
+            stats.count("grasp.iterations")
+            if improved:
+                stats.count("grasp.improvements")
+            stats.event("grasp.iteration", iteration=it, score=s, weight=w,
+                        improved=improved, best=best_s)
+        if improved:
+            yield c, s, w
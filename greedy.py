@@ -1,34 +1,82 @@
 """Greedy approach for the 0-1 knapsack problem (women)."""
-from collections.abc import Hashable
-from typing import List, Tuple
-import pandas as pd
+from __future__ import annotations
+from collections.abc import Hashable, Iterable
+from typing import TYPE_CHECKING, List, Tuple
+import numpy as np
+from instance import KnapsackInstance, as_instance
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def greedy_order(inst: KnapsackInstance) -> np.ndarray:
+    """Positions by ratio desc, risk_score desc, weight asc
+    (stable, like sort_values)."""
+    weights, scores = inst.weights, inst.scores
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = scores / weights
+    return np.lexsort((weights, -scores, -ratio))
+
+
+def greedy_fill(w_sorted: np.ndarray, max_weight: int) -> np.ndarray:
+    """Mask of the items greedy takes when scanning w_sorted in order.
+    Works on a growing window: one cumsum takes the longest run of fitting
+    items, and after a blocking item the leftover capacity is smaller than
+    its weight, so few rounds are needed and small capacities never touch
+    the tail of a long array."""
+    n = len(w_sorted)
+    take = np.zeros(n, dtype=bool)
+    if n == 0:
+        return take
+    w_min = int(w_sorted.min())
+    rem = int(max_weight)
+    start = 0
+    window = max(1024, 4 * (rem + 1))
+    while start < n and rem >= w_min:
+        stop = min(n, start + window)
+        idx = start + np.flatnonzero(w_sorted[start:stop] <= rem)
+        csum = np.cumsum(w_sorted[idx])
+        m = int(np.searchsorted(csum, rem, side="right"))
+        take[idx[:m]] = True
+        if m:
+            rem -= int(csum[m - 1])
+        if m < len(idx):
+            start = int(idx[m]) + 1
+        else:
+            start = stop
+            window *= 2
+    return take
+
+
+def greedy_multi_capacity(
+    df: pd.DataFrame | KnapsackInstance,
+    capacities: Iterable[int],
+) -> List[Tuple[List[Hashable], float, int]]:
+    """greedy_approach for several capacities from a single sort.
+    Returns one (choice, score, weight) per capacity, in the given order."""
+    inst = as_instance(df)
+    if (inst.weights < 0).any():
+        raise ValueError("greedy needs non-negative weights")
+    order = greedy_order(inst)
+    w_sorted = inst.weights[order]
+    s_sorted = inst.scores[order]
+
+    out: List[Tuple[List[Hashable], float, int]] = []
+    for max_weight in capacities:
+        take = greedy_fill(w_sorted, max_weight)
+        picked = s_sorted[take]
+        # cumsum adds left to right, so the float total matches a plain loop
+        total_s = float(np.cumsum(picked)[-1]) if len(picked) else 0.0
+        total_w = int(w_sorted[take].sum())
+        out.append((inst.to_labels(order[take]), total_s, total_w))
+    return out
 
 
 def greedy_approach(
-    df: pd.DataFrame,
+    df: pd.DataFrame | KnapsackInstance,
     max_weight: int,
 ) -> Tuple[List[Hashable], float, int]:
     """Greedy approach for the 0-1 knapsack problem.
     Select items based on the highest ratio of risk_score to weight.
     """
-    temp = df.copy()
-    temp["ratio"] = temp["risk_score"] / temp["weight"]
-
-    temp = temp.sort_values(
-        by=["ratio", "risk_score", "weight"],
-        ascending=[False, False, True],
-    )
-
-    choice: List[Hashable] = []
-    total_w = 0
-    total_s = 0.0
-
-    for idx, row in temp.iterrows():
-        w = int(row["weight"])
-        r = float(row["risk_score"])
-        if total_w + w <= max_weight:
-            choice.append(idx)
-            total_w += w
-            total_s += r
-
-    return choice, total_s, total_w
+    return greedy_multi_capacity(df, [max_weight])[0]
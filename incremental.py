@@ -0,0 +1,225 @@
+"""Keeping a selection current while rows are appended and removed."""
+from collections.abc import Callable, Hashable, Iterable
+from typing import List, Tuple
+import heapq
+import random
+import numpy as np
+import pandas as pd
+from data import clean_frame
+from instance import KnapsackInstance, as_instance
+from local_search import first_improvement_step, ratio
+from scoring import score_frame
+
+
+class IncrementalSelection:
+    """A population that grows and shrinks, with a selection kept within
+    max_weight. Rows live at fixed positions in plain lists (removed ones
+    are only marked dead), and outside candidates sit in a heap by the
+    local search ratio, so appends, removals and improve() cost depends on
+    the delta and the selection size, not on the population."""
+
+    __slots__ = ("max_weight", "w", "r", "labels", "alive", "chosen",
+                 "tw", "ts", "alpha", "lambda_w", "top_out", "rn",
+                 "_pos", "_heap")
+
+    def __init__(
+        self,
+        inst: KnapsackInstance,
+        max_weight: int,
+        choice: Iterable[Hashable] | None = None,
+        *,
+        alpha: float = 0.9,
+        lambda_w: float = 0.5,
+        top_out: int = 40,
+        seed: int = 0,
+    ) -> None:
+        self.max_weight = max_weight
+        self.alpha, self.lambda_w, self.top_out = alpha, lambda_w, top_out
+        self.rn = random.Random(seed)
+        self.w: list[int] = []
+        self.r: list[float] = []
+        self.labels: list[Hashable] = []
+        self.alive = bytearray()
+        self.chosen: set[int] = set()
+        self.tw, self.ts = 0, 0.0
+        self._pos: dict[Hashable, int] = {}
+        self._heap: list[tuple[float, int]] = []
+        self.append(inst.weights.tolist(), inst.scores.tolist(),
+                    np.asarray(inst.labels).tolist())
+        if choice is not None:
+            chosen = [self._pos[lab] for lab in choice]
+            self.chosen = set(chosen)
+            self.tw = sum(self.w[i] for i in self.chosen)
+            self.ts = sum(self.r[i] for i in self.chosen)
+            if self.tw > max_weight:
+                raise ValueError("choice exceeds max_weight")
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: pd.DataFrame,
+        max_weight: int,
+        choice: Iterable[Hashable] | None = None,
+        *,
+        alpha: float = 0.9,
+        lambda_w: float = 0.5,
+        top_out: int = 40,
+        seed: int = 0,
+    ) -> "IncrementalSelection":
+        """Starts from a prepared frame and, optionally, a selection of
+        its labels (e.g. the last solver result)."""
+        return cls(as_instance(df), max_weight, choice, alpha=alpha,
+                   lambda_w=lambda_w, top_out=top_out, seed=seed)
+
+    def __len__(self) -> int:
+        """Number of live rows."""
+        return len(self._pos)
+
+    def _key(self, j: int) -> float:
+        return ratio(self.r[j], self.w[j], self.alpha, self.lambda_w)
+
+    def _push(self, j: int) -> None:
+        if self.r[j] > 0:
+            heapq.heappush(self._heap, (-self._key(j), j))
+
+    def append(
+        self,
+        weights: Iterable[int],
+        scores: Iterable[float],
+        labels: Iterable[Hashable],
+    ) -> list[int]:
+        """Adds scored rows; returns their positions. Labels must be new
+        and distinct; otherwise ValueError is raised and nothing is added."""
+        rows = list(zip(weights, scores, labels))
+        seen: set[Hashable] = set()
+        for _, _, lab in rows:
+            if lab in self._pos or lab in seen:
+                raise ValueError(f"duplicate label {lab!r}")
+            seen.add(lab)
+        added = []
+        for wj, rj, lab in rows:
+            j = len(self.w)
+            self.w.append(int(wj))
+            self.r.append(float(rj))
+            self.labels.append(lab)
+            self.alive.append(1)
+            self._pos[lab] = j
+            added.append(j)
+        if len(added) > len(self._heap):
+            # cheaper to rebuild than to push one by one
+            self._heap.extend((-self._key(j), j) for j in added
+                              if self.r[j] > 0)
+            heapq.heapify(self._heap)
+        else:
+            for j in added:
+                self._push(j)
+        return added
+
+    def append_frame(self, df: pd.DataFrame) -> list[int]:
+        """Adds new rows of a frame: raw rows are cleaned and scored here,
+        frames that already have risk_score and weight are used as is.
+        The index gives the labels, so a frame read with a default
+        RangeIndex (0, 1, ...) collides with the labels already loaded;
+        give it distinct labels (e.g. an id column) first."""
+        if not {"risk_score", "weight"} <= set(df.columns):
+            df = clean_frame(df.copy())
+            risk, weight = score_frame(df)
+        else:
+            risk, weight = df["risk_score"], df["weight"]
+        return self.append(np.asarray(weight).tolist(),
+                           np.asarray(risk).tolist(), df.index.tolist())
+
+    def remove(self, labels: Iterable[Hashable]) -> None:
+        """Drops rows (and frees their weight if selected); call improve()
+        afterwards to refill the freed capacity. Unknown or repeated labels
+        raise KeyError before anything is removed."""
+        labels = list(labels)
+        seen: set[Hashable] = set()
+        for lab in labels:
+            if lab not in self._pos or lab in seen:
+                raise KeyError(lab)
+            seen.add(lab)
+        for lab in labels:
+            j = self._pos.pop(lab)
+            self.alive[j] = 0
+            if j in self.chosen:
+                self.chosen.discard(j)
+                self.tw -= self.w[j]
+                self.ts -= self.r[j]
+
+    def _top_outside(self) -> list[int]:
+        """Best top_out live outside items by ratio, taken off the heap
+        (stale entries are dropped on the way)."""
+        if len(self._heap) > 2 * len(self._pos) + 64:
+            self._heap = [(-self._key(j), j) for j in self._pos.values()
+                          if j not in self.chosen and self.r[j] > 0]
+            heapq.heapify(self._heap)
+        heap = self._heap
+        out: list[int] = []
+        while heap and len(out) < self.top_out:
+            _, j = heapq.heappop(heap)
+            if self.alive[j] and j not in self.chosen and j not in out:
+                out.append(j)
+        return out
+
+    def improve(self, max_steps: int | None = None) -> bool:
+        """First-improvement moves (+, 1 swap 1, 1 swap 2, 2 swap 1) of
+        the current selection against the best outside candidates, until
+        none applies. Returns whether anything changed."""
+        changed = False
+        steps = 0
+        while max_steps is None or steps < max_steps:
+            outside = self._top_outside()
+            inside = list(self.chosen)
+            self.rn.shuffle(inside)
+            self.chosen, self.tw, self.ts, improved = first_improvement_step(
+                self.chosen, self.tw, self.ts, self.max_weight,
+                self.w, self.r, inside, outside,
+                self.alpha, self.lambda_w, top_out=self.top_out,
+            )
+            for j in outside:
+                if j not in self.chosen:
+                    self._push(j)
+            for i in inside:
+                if i not in self.chosen:
+                    self._push(i)
+            if not improved:
+                break
+            changed = True
+            steps += 1
+        return changed
+
+    def instance(self) -> KnapsackInstance:
+        """Live rows as a KnapsackInstance (O(population))."""
+        pos = np.frombuffer(bytes(self.alive), dtype=np.uint8).nonzero()[0]
+        return KnapsackInstance(
+            np.asarray(self.w)[pos], np.asarray(self.r)[pos],
+            np.asarray(self.labels, dtype=object)[pos])
+
+    def resolve(
+        self,
+        solver: Callable | None = None,
+        **params: object,
+    ) -> Tuple[List[Hashable], float, int]:
+        """Re-optimizes from the current selection. Without solver this is
+        improve(); otherwise solver(instance, max_weight,
+        start_choice=current, **params) runs over the whole population
+        (e.g. simulated_annealing) and its result is kept if not worse."""
+        if solver is None:
+            self.improve()
+            return self.result()
+        choice, score, weight = solver(
+            self.instance(), self.max_weight,
+            start_choice=self.result()[0], **params)
+        if (score > self.ts) or (score == self.ts and weight < self.tw):
+            old = self.chosen
+            self.chosen = {self._pos[lab] for lab in choice}
+            self.ts, self.tw = score, weight
+            for i in old - self.chosen:
+                self._push(i)
+        return self.result()
+
+    def result(self) -> Tuple[List[Hashable], float, int]:
+        """Current (choice, score, weight)."""
+        choice = [self.labels[i] for i in self.chosen]
+        return choice, self.ts, self.tw
@@ -0,0 +1,73 @@
+"""Array-backed knapsack instance shared by all solvers."""
+from collections.abc import Hashable, Iterable, Sequence
+import time
+import numpy as np
+
+
+class KnapsackInstance:
+    """Items as contiguous weight, score and ratio arrays.
+    Solvers work on integer positions 0..n-1; labels[pos] maps a position
+    back to the DataFrame index label. ratios can be passed in when they
+    are already computed (e.g. shared with a worker process)."""
+
+    __slots__ = ("weights", "scores", "ratios", "labels", "_label_pos")
+
+    def __init__(
+        self,
+        weights: Sequence[int] | np.ndarray,
+        scores: Sequence[float] | np.ndarray,
+        labels: Sequence[Hashable] | np.ndarray | None = None,
+        *,
+        ratios: np.ndarray | None = None,
+    ) -> None:
+        self.weights = np.ascontiguousarray(weights, dtype=np.int64)
+        self.scores = np.ascontiguousarray(scores, dtype=np.float64)
+        if self.weights.shape != self.scores.shape:
+            raise ValueError("weights and scores must have the same length")
+        if ratios is None:
+            ratios = self.scores / np.maximum(self.weights, 1)
+        self.ratios = ratios
+        if labels is None:
+            labels = np.arange(len(self.weights))
+        if len(labels) != len(self.weights):
+            raise ValueError("labels must have one entry per item")
+        self.labels = labels
+        self._label_pos: dict[Hashable, int] | None = None
+
+    @classmethod
+    def from_frame(cls, df) -> "KnapsackInstance":
+        """Instance over df's weight and risk_score columns."""
+        return cls(
+            df["weight"].to_numpy(dtype=np.int64),
+            df["risk_score"].to_numpy(dtype=np.float64),
+            df.index,
+        )
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def positions(self, labels: Iterable[Hashable]) -> list[int]:
+        """Positions of the given labels (KeyError for unknown ones)."""
+        if self._label_pos is None:
+            own = np.asarray(self.labels).tolist()
+            self._label_pos = {lab: i for i, lab in enumerate(own)}
+        return [self._label_pos[lab] for lab in labels]
+
+    def to_labels(self, positions: Iterable[int]) -> list[Hashable]:
+        """Index labels of the given positions, in the same order."""
+        pos = np.fromiter(positions, dtype=np.int64)
+        return np.asarray(self.labels)[pos].tolist()
+
+
+def as_instance(data) -> KnapsackInstance:
+    """Returns data itself if it is an instance, else builds one from the
+    DataFrame (weight and risk_score columns)."""
+    if isinstance(data, KnapsackInstance):
+        return data
+    return KnapsackInstance.from_frame(data)
+
+
+def deadline_after(time_limit: float | None) -> float | None:
+    """time.monotonic() deadline for time_limit seconds from now (None
+    for no limit). Solvers compare against it between steps."""
+    return None if time_limit is None else time.monotonic() + time_limit
@@ -0,0 +1,69 @@
+"""Opt-in counters, phase timers and events for the heuristics."""
+from collections.abc import Callable
+import json
+
+
+class SolverStats:
+    """Collects what a solver run did. Solvers take stats=None by default
+    and only touch this object when one is passed, so an uninstrumented
+    run pays a single None check per step.
+    counters: name -> count, timers: phase -> seconds, events: list of
+    (kind, data) records; callback(kind, data) sees every event as it
+    happens (e.g. for progress output)."""
+
+    __slots__ = ("counters", "timers", "events", "callback",
+                 "record_events")
+
+    def __init__(
+        self,
+        callback: Callable[[str, dict], None] | None = None,
+        *,
+        record_events: bool = True,
+    ) -> None:
+        self.counters: dict[str, int] = {}
+        self.timers: dict[str, float] = {}
+        self.events: list[tuple[str, dict]] = []
+        self.callback = callback
+        self.record_events = record_events
+
+    def count(self, name: str, k: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + k
+
+    def add_time(self, name: str, seconds: float) -> None:
+        self.timers[name] = self.timers.get(name, 0.0) + seconds
+
+    def event(self, kind: str, **data: object) -> None:
+        if self.record_events:
+            self.events.append((kind, data))
+        if self.callback is not None:
+            self.callback(kind, data)
+
+    def merge(self, other: "SolverStats | dict") -> None:
+        """Adds counters and timers (and events) of another run, e.g. one
+        collected in a worker process and sent back as to_dict()."""
+        if isinstance(other, SolverStats):
+            other = other.to_dict()
+        for name, k in other.get("counters", {}).items():
+            self.count(name, k)
+        for name, s in other.get("timers", {}).items():
+            self.add_time(name, s)
+        if self.record_events:
+            self.events.extend((e["kind"], e["data"])
+                               for e in other.get("events", []))
+
+    def to_dict(self) -> dict:
+        return {
+            "counters": dict(self.counters),
+            "timers": dict(self.timers),
+            "events": [{"kind": kind, "data": data}
+                       for kind, data in self.events],
+        }
+
+    def to_json(self, path: str | None = None,
+                indent: int | None = None) -> str:
+        """JSON text of to_dict(); also written to path if given."""
+        text = json.dumps(self.to_dict(), indent=indent)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
@@ -0,0 +1,100 @@
+"""Pandas-free loading: a raw CSV straight into a KnapsackInstance.
+Cleans and scores the rows the way prepare_dataset does (same rows, same
+risk_score and weight, same index labels) without building a DataFrame."""
+import csv
+import math
+import re
+import numpy as np
+from instance import KnapsackInstance
+from scoring import SCORED_COLUMNS, score_codes
+
+# strings pandas.read_csv reads as missing by default
+NA_VALUES = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+})
+TEXT_COLUMNS = ("Education", "Employment", "Marital status")
+_SPACES = re.compile(r"\s+")
+
+
+def parse_number(value: str) -> float:
+    """pd.to_numeric(errors="coerce") for one field. float() also takes
+    digit separators ("1_000") and non-ASCII digits, which pandas does
+    not, so those are missing too."""
+    if value in NA_VALUES or "_" in value or not value.isascii():
+        return math.nan
+    try:
+        return float(value)
+    except ValueError:
+        return math.nan
+
+
+def clean_text(value: str) -> str:
+    """One categorical field as clean_frame leaves it (missing is 'nan')."""
+    if value in NA_VALUES:
+        return "nan"
+    return _SPACES.sub(" ", value.strip().lower())
+
+
+def income_bracket(x: float) -> str:
+    """categorize_income for one value (NaN ends up as 'high')."""
+    if x == 0:
+        return "no_income"
+    if 0 < x <= 500:
+        return "very_low"
+    if 500 < x <= 2000:
+        return "low"
+    if 2000 < x <= 5000:
+        return "middle"
+    if 5000 < x <= 10000:
+        return "upper_middle"
+    return "high"
+
+
+def load_instance(path: str = "data.csv") -> KnapsackInstance:
+    """Reads path with the csv module and returns the prepared instance.
+    Labels are the row numbers prepare_dataset gives as index. Each
+    categorical column is coded while reading, so scoring works on codes
+    (score_codes) like score_frame does."""
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = [name.strip() for name in next(reader)]
+        col = {name: header.index(name) for name in
+               ("Age", "Income") + TEXT_COLUMNS}
+        width = len(header)
+        ages: list[float] = []
+        labels: list[int] = []
+        values: dict[str, dict[str, int]] = {c: {} for c in SCORED_COLUMNS}
+        codes: dict[str, list[int]] = {c: [] for c in SCORED_COLUMNS}
+        label = -1
+        for row in reader:
+            if not row:
+                continue  # blank lines are skipped, as read_csv does
+            label += 1
+            if len(row) < width:
+                row += [""] * (width - len(row))
+            income = parse_number(row[col["Income"]])
+            if income == 35000:
+                continue
+            marital = row[col["Marital status"]]
+            if marital in ("unmarred", "unmaried"):
+                marital = "unmarried"
+            cells = {
+                "Education": clean_text(row[col["Education"]]),
+                "Employment": clean_text(row[col["Employment"]]),
+                "Marital status": clean_text(marital),
+                "Income": income_bracket(income),
+            }
+            if cells["Employment"] == "semi-employed":
+                cells["Employment"] = "semi employed"
+            for c, value in cells.items():
+                codes[c].append(values[c].setdefault(value, len(values[c])))
+            ages.append(parse_number(row[col["Age"]]))
+            labels.append(label)
+
+    risk, weight = score_codes(
+        np.asarray(ages, dtype=np.float64),
+        {c: np.asarray(codes[c], dtype=np.int64) for c in SCORED_COLUMNS},
+        {c: list(values[c]) for c in SCORED_COLUMNS})
+    return KnapsackInstance(weight, risk, np.asarray(labels, dtype=np.int64))
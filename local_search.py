@@ -1,9 +1,18 @@
 """Local search algorithms for the knapsack problem (women)."""
-from collections.abc import Hashable
-from itertools import combinations
-from typing import List
+from __future__ import annotations
+from collections.abc import Hashable, Iterator, Sequence
+from typing import TYPE_CHECKING
+import math
 import random
-import pandas as pd
+import time
+import numpy as np
+from instance import KnapsackInstance, as_instance, deadline_after
+from instrumentation import SolverStats
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+MOVES = ("add", "swap_1_1", "swap_1_2", "swap_2_1")
 
 
 def ratio(rj: float, wj: int, alpha: float, lambda_w: float) -> float:
@@ -13,21 +22,56 @@ def ratio(rj: float, wj: int, alpha: float, lambda_w: float) -> float:
 
 
 def first_improvement_step(
-    chosen: set[Hashable],
+    chosen: set[int],
     total_w: int,
     total_s: float,
     max_weight: int,
-    weights: dict[Hashable, int],
-    scores: dict[Hashable, float],
-    in_order: List[Hashable],
-    out_order: List[Hashable],
+    weights: Sequence[int],
+    scores: Sequence[float],
+    in_order: Sequence[int],
+    out_order: Sequence[int],
     alpha: float,
     lambda_w: float,
     top_out: int = 40,
-) -> tuple[set[Hashable], int, float, bool]:
+    stats: SolverStats | None = None,
+    deadline: float | None = None,
+) -> tuple[set[int], int, float, bool]:
     """One step of first-improvement local search with moves +,
-    1 swap 1, 1 swap 2, 2 swap 1."""
+    1 swap 1, 1 swap 2, 2 swap 1. With stats, counts the candidate moves
+    examined (ls.evaluated.<move>) and the move applied (ls.applied.<move>),
+    moves named as in MOVES. Past deadline (a time.monotonic() value) the
+    scan gives up and reports no improvement."""
+    chosen, total_w, total_s, move, evaluated = _improvement_step(
+        chosen, total_w, total_s, max_weight, weights, scores,
+        in_order, out_order, alpha, lambda_w, top_out, deadline)
+    if stats is not None:
+        for name, k in zip(MOVES, evaluated):
+            if k:
+                stats.count("ls.evaluated." + name, k)
+        if move is not None:
+            stats.count("ls.applied." + move)
+    return chosen, total_w, total_s, move is not None
+
+
+def _improvement_step(
+    chosen: set[int],
+    total_w: int,
+    total_s: float,
+    max_weight: int,
+    weights: Sequence[int],
+    scores: Sequence[float],
+    in_order: Sequence[int],
+    out_order: Sequence[int],
+    alpha: float,
+    lambda_w: float,
+    top_out: int = 40,
+    deadline: float | None = None,
+) -> tuple[set[int], int, float, str | None, tuple[int, ...]]:
+    """first_improvement_step body. Returns the applied move (or None) and
+    the number of candidates examined per move type, counted per outer
+    item so the inner loops stay as they are."""
     w, r = weights, scores
+    n11 = n12 = n21 = 0
 
     out_sorted = sorted(
         out_order,
@@ -35,16 +79,38 @@ def first_improvement_step(
         reverse=True,
     )[:top_out]
 
-    for j in out_sorted:
+    for a, j in enumerate(out_sorted):
         wj, rj = w[j], r[j]
         if rj <= 0:
             continue
         if total_w + wj <= max_weight:
             chosen.add(j)
-            return chosen, total_w + wj, total_s + rj, True
+            return (chosen, total_w + wj, total_s + rj, "add",
+                    (a + 1, 0, 0, 0))
+    n_add = len(out_sorted)
+    if not out_sorted:
+        return chosen, total_w, total_s, None, (0, 0, 0, 0)
+
+    # bounds over the candidates, so hopeless i / (j, k) / (i, u) are skipped
+    slack = max_weight - total_w
+    out_w = [w[j] for j in out_sorted]
+    out_r = [r[j] for j in out_sorted]
+    m = len(out_sorted)
+    max_out_r, min_out_w = max(out_r), min(out_w)
+    suf_r = [-math.inf] * (m + 1)  # best score among out_sorted[a:]
+    suf_w = [math.inf] * (m + 1)  # lightest weight among out_sorted[a:]
+    for a in range(m - 1, -1, -1):
+        suf_r[a] = max(out_r[a], suf_r[a + 1])
+        suf_w[a] = min(out_w[a], suf_w[a + 1])
+
     # 1 swap 1
     for i in in_order:
+        if deadline is not None and time.monotonic() > deadline:
+            return chosen, total_w, total_s, None, (n_add, n11, 0, 0)
         wi, ri = w[i], r[i]
+        if ri >= max_out_r or min_out_w > slack + wi:
+            continue
+        n11 += m
         for j in out_sorted:
             wj, rj = w[j], r[j]
             if rj <= ri:
@@ -52,41 +118,81 @@ def first_improvement_step(
             if total_w - wi + wj <= max_weight:
                 chosen.remove(i)
                 chosen.add(j)
-                return chosen, total_w - wi + wj, total_s - ri + rj, True
+                n11 -= m - 1 - out_sorted.index(j)
+                return (chosen, total_w - wi + wj, total_s - ri + rj,
+                        "swap_1_1", (n_add, n11, 0, 0))
     # 1 swap 2
-    for i in in_order:
-        wi, ri = w[i], r[i]
-        for j, k in combinations(out_sorted, 2):
-            wjk = w[j] + w[k]
-            rjk = r[j] + r[k]
-            if rjk <= ri:
+    if m >= 2:
+        top2_r = sum(sorted(out_r)[-2:])
+        low2_w = sum(sorted(out_w)[:2])
+        for i in in_order:
+            if deadline is not None and time.monotonic() > deadline:
+                return chosen, total_w, total_s, None, (n_add, n11, n12, 0)
+            wi, ri = w[i], r[i]
+            cap = slack + wi
+            if top2_r <= ri or low2_w > cap:
                 continue
-            if total_w - wi + wjk <= max_weight:
-                chosen.remove(i)
-                chosen.update([j, k])
-                return chosen, total_w - wi + wjk, total_s - ri + rjk, True
+            for a in range(m - 1):
+                j, wj, rj = out_sorted[a], out_w[a], out_r[a]
+                if rj + suf_r[a + 1] <= ri or wj + suf_w[a + 1] > cap:
+                    continue
+                n12 += m - a - 1
+                for b in range(a + 1, m):
+                    k = out_sorted[b]
+                    wjk = wj + out_w[b]
+                    rjk = rj + out_r[b]
+                    if rjk <= ri:
+                        continue
+                    if total_w - wi + wjk <= max_weight:
+                        chosen.remove(i)
+                        chosen.update([j, k])
+                        n12 -= m - 1 - b
+                        return (chosen, total_w - wi + wjk,
+                                total_s - ri + rjk, "swap_1_2",
+                                (n_add, n11, n12, 0))
 
     in_list = list(in_order)  # korisno kad želiš više prolaza, indeksiranje
     # ili kombinacije nad istim skupom elemenata.
     # 2 swap 1
-    for i, u in combinations(in_list, 2):
-        wiu = w[i] + w[u]
-        riu = r[i] + r[u]
-        for j in out_sorted:
-            wj, rj = w[j], r[j]
-            if rj <= riu:
+    n_in = len(in_list)
+    in_w = [w[i] for i in in_list]
+    in_r = [r[i] for i in in_list]
+    suf_in_r = [math.inf] * (n_in + 1)  # lowest score among in_list[a:]
+    suf_in_w = [-math.inf] * (n_in + 1)  # heaviest among in_list[a:]
+    for a in range(n_in - 1, -1, -1):
+        suf_in_r[a] = min(in_r[a], suf_in_r[a + 1])
+        suf_in_w[a] = max(in_w[a], suf_in_w[a + 1])
+    for a in range(n_in - 1):
+        if deadline is not None and time.monotonic() > deadline:
+            break
+        i, wi, ri = in_list[a], in_w[a], in_r[a]
+        if (ri + suf_in_r[a + 1] >= max_out_r
+                or wi + suf_in_w[a + 1] + slack < min_out_w):
+            continue
+        for b in range(a + 1, n_in):
+            u = in_list[b]
+            wiu = wi + in_w[b]
+            riu = ri + in_r[b]
+            if riu >= max_out_r or wiu + slack < min_out_w:
                 continue
-            if total_w - wiu + wj <= max_weight:
-                chosen.remove(i)
-                chosen.remove(u)
-                chosen.add(j)
-                return chosen, total_w - wiu + wj, total_s - riu + rj, True
+            n21 += m
+            for j in out_sorted:
+                wj, rj = w[j], r[j]
+                if rj <= riu:
+                    continue
+                if total_w - wiu + wj <= max_weight:
+                    chosen.remove(i)
+                    chosen.remove(u)
+                    chosen.add(j)
+                    n21 -= m - 1 - out_sorted.index(j)
+                    return (chosen, total_w - wiu + wj, total_s - riu + rj,
+                            "swap_2_1", (n_add, n11, n12, n21))
 
-    return chosen, total_w, total_s, False
+    return chosen, total_w, total_s, None, (n_add, n11, n12, n21)
 
 
 def local_search_first_improvement(
-    df: pd.DataFrame,
+    df: pd.DataFrame | KnapsackInstance,
     max_weight: int,
     start_choice: list[Hashable] | None = None,
     max_no_improve: int = 3,
@@ -94,35 +200,125 @@ def local_search_first_improvement(
     lambda_w: float = 0.5,
     top_out: int = 40,
     rn: random.Random | None = None,
+    stats: SolverStats | None = None,
+    time_limit: float | None = None,
 ) -> tuple[list[Hashable], float, int]:
     """Local search with first-improvement strategy.
     Uses moves +, 1 swap 1, 1 swap 2, 2 swap 1.
     If start_choice is None, a greedy solution is used
-    as the starting point."""
+    as the starting point. stats (optional) collects move counters, the
+    ls.total timer and one ls.move event per applied move. With
+    time_limit (seconds) it returns the best solution so far once the
+    time is up. The limit is checked while the greedy start is built,
+    after each pass's ratio sort and inside the move scans; the sorts
+    themselves are not interrupted, so a very large instance can overrun
+    a tiny limit by about one sort."""
+    inst = as_instance(df)
+    start = None if start_choice is None else inst.positions(start_choice)
+    chosen, ts, tw = local_search_positions(
+        inst.weights.tolist(), inst.scores.tolist(), max_weight,
+        start=start, max_no_improve=max_no_improve,
+        alpha=alpha, lambda_w=lambda_w, top_out=top_out, rn=rn,
+        stats=stats, deadline=deadline_after(time_limit),
+    )
+    return inst.to_labels(chosen), ts, tw
+
+
+def iter_local_search(
+    df: pd.DataFrame | KnapsackInstance,
+    max_weight: int,
+    start_choice: list[Hashable] | None = None,
+    max_no_improve: int = 3,
+    alpha: float = 0.9,
+    lambda_w: float = 0.5,
+    top_out: int = 40,
+    rn: random.Random | None = None,
+    stats: SolverStats | None = None,
+    time_limit: float | None = None,
+) -> Iterator[tuple[list[Hashable], float, int]]:
+    """local_search_first_improvement as a generator: yields the start
+    solution and then every improved one (choice, score, weight). The
+    last one yielded is what local_search_first_improvement returns."""
+    inst = as_instance(df)
+    start = None if start_choice is None else inst.positions(start_choice)
+    for chosen, ts, tw in local_search_iter_positions(
+        inst.weights.tolist(), inst.scores.tolist(), max_weight,
+        start=start, max_no_improve=max_no_improve,
+        alpha=alpha, lambda_w=lambda_w, top_out=top_out, rn=rn,
+        stats=stats, deadline=deadline_after(time_limit),
+    ):
+        yield inst.to_labels(chosen), ts, tw
+
+
+def local_search_positions(
+    w: list[int],
+    r: list[float],
+    max_weight: int,
+    *,
+    start: list[int] | None = None,
+    max_no_improve: int = 3,
+    alpha: float = 0.9,
+    lambda_w: float = 0.5,
+    top_out: int = 40,
+    rn: random.Random | None = None,
+    stats: SolverStats | None = None,
+    deadline: float | None = None,
+) -> tuple[list[int], float, int]:
+    """local_search_first_improvement over item positions, with weights
+    and scores as plain lists (see KnapsackInstance). deadline is a
+    time.monotonic() value."""
+    started = time.perf_counter()
+    # the generator yields the live set; the last state is the result
+    for chosen, ts, tw in local_search_iter_positions(
+        w, r, max_weight, start=start, max_no_improve=max_no_improve,
+        alpha=alpha, lambda_w=lambda_w, top_out=top_out, rn=rn,
+        stats=stats, deadline=deadline,
+    ):
+        pass
+    if stats is not None:
+        stats.add_time("ls.total", time.perf_counter() - started)
+    return list(chosen), ts, tw
+
+
+def local_search_iter_positions(
+    w: list[int],
+    r: list[float],
+    max_weight: int,
+    *,
+    start: list[int] | None = None,
+    max_no_improve: int = 3,
+    alpha: float = 0.9,
+    lambda_w: float = 0.5,
+    top_out: int = 40,
+    rn: random.Random | None = None,
+    stats: SolverStats | None = None,
+    deadline: float | None = None,
+) -> Iterator[tuple[set[int], float, int]]:
+    """Yields (chosen, score, weight) for the start and after every
+    improving move. chosen is the live set, copy it to keep it."""
     if rn is None:
         rn = random.Random(0)
 
-    w = df["weight"].astype(int).to_dict()
-    r = df["risk_score"].astype(float).to_dict()
-    all_ids: list[Hashable] = list(df.index)
-
-    if start_choice is None:
-        ids = sorted(
-            all_ids,
-            key=lambda j: ratio(r[j], w[j], alpha, lambda_w),
-            reverse=True,
-        )
-        chosen: set[Hashable] = set()
+    # ratio() for all items at once
+    keys = np.asarray(r) / ((np.maximum(w, 1) + lambda_w) ** alpha)
+
+    if start is None:
+        # by ratio desc, ties by position; once the deadline passes the
+        # fill stops where it is (it fits), after at least 4096 candidates
+        by_ratio = np.argsort(-keys, kind="stable")
+        ids = by_ratio[np.asarray(r)[by_ratio] > 0].tolist()
+        chosen: set[int] = set()
         tw, ts = 0, 0.0
-        for j in ids:
-            if r[j] <= 0:
-                continue
+        for k, j in enumerate(ids):
+            if (deadline is not None and k and not k & 4095
+                    and time.monotonic() > deadline):
+                break
             if tw + w[j] <= max_weight:
                 chosen.add(j)
                 tw += w[j]
                 ts += r[j]
     else:
-        chosen = set(start_choice)
+        chosen = set(start)
         tw = sum(w[i] for i in chosen)
         ts = sum(r[i] for i in chosen)
 
@@ -139,32 +335,60 @@ def local_search_first_improvement(
                     tw += w[j]
                     ts += r[j]
 
+    yield chosen, ts, tw
+    n = len(w)
+
     no_improve = 0
     while no_improve < max_no_improve:
+        if deadline is not None and time.monotonic() > deadline:
+            break
         improved_ = False
 
-        inside = list(chosen)
-        outside = [i for i in all_ids if i not in chosen]
-        rn.shuffle(inside)  # random pretraga susjedstva
-        rn.shuffle(outside)
+        # outside ranked by ratio, ties in a fresh random order every pass;
+        # out_flags[rank] marks outside items, so the top_out candidates are
+        # found with bytearray.find and only the moved items are updated
+        tie = np.random.default_rng(rn.getrandbits(64)).permutation(n)
+        order = np.lexsort((tie, -keys))
+        rank_of = np.empty(n, dtype=np.int64)
+        rank_of[order] = np.arange(n)
+        flags = np.ones(n, dtype=np.uint8)
+        flags[rank_of[list(chosen)]] = 0
+        out_flags = bytearray(flags.tobytes())
+        order_l, rank_l = order.tolist(), rank_of.tolist()
+        if deadline is not None and time.monotonic() > deadline:
+            break
 
         while True:
+            inside = list(chosen)
+            rn.shuffle(inside)  # random pretraga susjedstva
+            outside: list[int] = []
+            at = out_flags.find(1)
+            while at >= 0 and len(outside) < top_out:
+                outside.append(order_l[at])
+                at = out_flags.find(1, at + 1)
+
             chosen, tw, ts, improved = first_improvement_step(
                 chosen, tw, ts, max_weight, w, r,
-                inside, outside, alpha, lambda_w, top_out=top_out
+                inside, outside, alpha, lambda_w, top_out=top_out,
+                stats=stats, deadline=deadline,
             )
             if not improved:
                 break
             improved_ = True
+            if stats is not None:
+                stats.event("ls.move", score=ts, weight=tw)
+            yield chosen, ts, tw
 
-            inside = list(chosen)
-            outside = [i for i in all_ids if i not in chosen]
-            rn.shuffle(inside)
-            rn.shuffle(outside)
+            for i in inside:
+                if i not in chosen:
+                    out_flags[rank_l[i]] = 1
+            for j in outside:
+                if j in chosen:
+                    out_flags[rank_l[j]] = 0
 
+        if stats is not None:
+            stats.count("ls.passes")
         if improved_:
             no_improve = 0
         else:
             no_improve += 1
-
-    return list(chosen), ts, tw
@@ -0,0 +1,98 @@
+"""Runs one selection algorithm on a data file and prints the result.
+
+python main.py --algorithm grasp --budget 51 --param iterations=100
+python main.py --all          # every algorithm with reports (all_test.py)
+
+The CSV is read by loader.load_instance and only the chosen solver module
+is imported, so a run does not load pandas unless --pandas or --evaluate
+asks for the DataFrame pipeline (or --cache, whose keys hash it).
+"""
+from collections.abc import Sequence
+import argparse
+import json
+import runpy
+import time
+from partitioned import SOLVERS, resolve_solver
+
+
+def parse_param(text: str) -> tuple[str, object]:
+    """KEY=VALUE with VALUE read as JSON when it parses (numbers, true,
+    null, lists), else kept as a string."""
+    key, sep, value = text.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected KEY=VALUE, got {text!r}")
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--algorithm", "-a", choices=list(SOLVERS),
+                        default="greedy")
+    parser.add_argument("--budget", "-W", type=int, default=51)
+    parser.add_argument("--data", default="data.csv")
+    parser.add_argument("--param", "-p", type=parse_param, action="append",
+                        default=[], metavar="KEY=VALUE",
+                        help="solver parameter (repeatable)")
+    parser.add_argument("--show", type=int, default=25,
+                        help="selected labels to print (0 = none)")
+    parser.add_argument("--pandas", action="store_true",
+                        help="load through prepare_dataset_cached")
+    parser.add_argument("--evaluate", action="store_true",
+                        help="score the selection against Violence")
+    parser.add_argument("--cache", action="store_true",
+                        help="reuse results stored under .cache/results")
+    parser.add_argument("--json", action="store_true",
+                        help="print the result as one JSON object")
+    parser.add_argument("--all", action="store_true",
+                        help="run all_test.py (every algorithm, reports)")
+    args = parser.parse_args(argv)
+
+    if args.all:
+        runpy.run_path("all_test.py", run_name="__main__")
+        return 0
+
+    t0 = time.perf_counter()
+    if args.pandas or args.evaluate:
+        from dataset_cache import prepare_dataset_cached
+        from instance import KnapsackInstance
+        df = prepare_dataset_cached(args.data)
+        inst = KnapsackInstance.from_frame(df)
+    else:
+        from loader import load_instance
+        inst = load_instance(args.data)
+    if args.cache:
+        # imported with the data, so solve time is the lookup or the run
+        from result_cache import RESULT_DIR, ResultCache, cached
+    t1 = time.perf_counter()
+    solver = resolve_solver(args.algorithm)
+    if args.cache:
+        solver = cached(solver, ResultCache(disk_dir=RESULT_DIR))
+    choice, score, weight = solver(inst, args.budget, **dict(args.param))
+    t2 = time.perf_counter()
+
+    result = {"algorithm": args.algorithm, "budget": args.budget,
+              "rows": len(inst), "score": float(score), "weight": int(weight),
+              "selected": len(choice), "load_seconds": t1 - t0,
+              "solve_seconds": t2 - t1}
+    if args.evaluate:
+        from evaluation import SelectionEvaluator
+        result["evaluation"] = SelectionEvaluator(df).evaluate(choice)
+    if args.json:
+        result["choice"] = list(choice)
+        print(json.dumps(result, default=float))
+        return 0
+    print(f"{args.algorithm}: score={result['score']:g} weight={weight} "
+          f"selected={len(choice)} of {len(inst)} rows "
+          f"(load {t1 - t0:.3f}s, solve {t2 - t1:.3f}s)")
+    if args.show:
+        print("selected:", list(choice)[:args.show])
+    if args.evaluate:
+        print("evaluation:", result["evaluation"])
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,135 @@
+"""Independent knapsacks per group (region, office, ...) of one frame."""
+from __future__ import annotations
+from collections.abc import Callable, Hashable, Mapping
+from typing import TYPE_CHECKING, List, Tuple
+import importlib
+import time
+import numpy as np
+from instance import KnapsackInstance, as_instance
+from shared import WORKER, instance_pool
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# solver name -> "module:function"; imported where the solver runs
+SOLVERS = {
+    "greedy": "greedy:greedy_approach",
+    "local_search": "local_search:local_search_first_improvement",
+    "simulated_annealing": "simulated_annealing:simulated_annealing",
+    "grasp": "grasp:grasp",
+    "dynamic_programming": "dynamic_programming:dynamic_programming",
+    "branch_and_bound": "branch_and_bound:branch_and_bound",
+    "compressed": "profiles:compressed_knapsack",
+}
+
+
+def resolve_solver(solver: str | Callable) -> Callable:
+    """Solver function for a SOLVERS name (callables pass through)."""
+    if callable(solver):
+        return solver
+    module, name = SOLVERS[solver].split(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def group_slices(
+    keys: pd.Series,
+) -> tuple[pd.Index, np.ndarray, np.ndarray]:
+    """(group values, row positions ordered by group, offsets): rows of
+    group g are order[offsets[g]:offsets[g + 1]], in frame order. Rows
+    with a missing key belong to no group."""
+    # imported here so that resolve_solver stays free of pandas
+    import pandas as pd
+
+    codes, uniques = pd.factorize(keys, sort=True)
+    codes = np.asarray(codes)
+    order = np.argsort(codes, kind="stable")
+    order = order[codes[order] >= 0]
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    return pd.Index(uniques), order, offsets
+
+
+def solve_slice(
+    inst: KnapsackInstance,
+    start: int,
+    stop: int,
+    capacity: int,
+    solver: str | Callable,
+    params: dict,
+) -> tuple[list[int], float, int, float]:
+    """Solves items start..stop-1 of inst on views (no copy). Returns
+    positions relative to start, score, weight and seconds."""
+    t0 = time.perf_counter()
+    sub = KnapsackInstance(inst.weights[start:stop], inst.scores[start:stop],
+                           ratios=inst.ratios[start:stop])
+    choice, score, weight = resolve_solver(solver)(sub, capacity, **params)
+    return (list(choice), float(score), int(weight),
+            time.perf_counter() - t0)
+
+
+def _worker_slice(
+    task: tuple[int, int, int],
+) -> tuple[list[int], float, int, float]:
+    start, stop, capacity = task
+    return solve_slice(WORKER["inst"], start, stop, capacity,
+                       WORKER["solver"], WORKER["params"])
+
+
+def solve_partitioned(
+    df: pd.DataFrame,
+    group_by: str,
+    capacities: Mapping[Hashable, int],
+    *,
+    solver: str | Callable = "greedy",
+    params: dict | None = None,
+    default_capacity: int | None = None,
+    workers: int | None = None,
+    mmap_path: str | None = None,
+) -> Tuple[List[Hashable], float, int, dict]:
+    """One knapsack per value of df[group_by], each with its own budget
+    from capacities (groups not listed get default_capacity, or are left
+    out when it is None). solver is a SOLVERS name or a module-level
+    function (df, max_weight, **params) -> (choice, score, weight).
+    Items are reordered by group once; each group is then a slice of
+    that instance, and with workers > 1 the slices are solved in a
+    process pool attached to it in shared memory (or in a memory-mapped
+    file at mmap_path).
+    Returns the merged (choice, score, weight) and per-group stats
+    (rows, capacity, score, weight, selected, seconds)."""
+    params = dict(params or {})
+    inst = as_instance(df)
+    groups, order, offsets = group_slices(df[group_by])
+    grouped = KnapsackInstance(inst.weights[order], inst.scores[order])
+
+    tasks, names = [], []
+    for g, key in enumerate(groups):
+        capacity = capacities.get(key, default_capacity)
+        if capacity is None:
+            continue
+        tasks.append((int(offsets[g]), int(offsets[g + 1]), int(capacity)))
+        names.append(key)
+
+    with instance_pool(
+        grouped, workers, len(tasks),
+        {"solver": solver, "params": params}, path=mmap_path,
+    ) as (pool, _):
+        if pool is not None:
+            results = list(pool.map(_worker_slice, tasks))
+        else:
+            results = [solve_slice(grouped, start, stop, cap, solver, params)
+                       for start, stop, cap in tasks]
+
+    labels = np.asarray(inst.labels)
+    choice: List[Hashable] = []
+    total_s, total_w = 0.0, 0
+    stats: dict = {}
+    for key, (start, stop, cap), (pos, score, weight, secs) in zip(
+            names, tasks, results):
+        rows = order[start + np.asarray(pos, dtype=np.int64)]
+        choice.extend(labels[rows].tolist())
+        total_s += score
+        total_w += weight
+        stats[key] = {"rows": stop - start, "capacity": cap, "score": score,
+                      "weight": weight, "selected": len(pos),
+                      "seconds": secs}
+    return choice, total_s, total_w, stats
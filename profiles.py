@@ -0,0 +1,164 @@
+"""Profile compression: rows with the same (risk_score, weight) form one
+item class, and the knapsack is solved over classes with counts."""
+from __future__ import annotations
+from collections.abc import Hashable, Sequence
+from typing import TYPE_CHECKING, List, Tuple
+import numpy as np
+from instance import KnapsackInstance, as_instance
+from dynamic_programming import dp_table, dp_backtrack
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class ItemClasses:
+    """Distinct (weight, score) profiles of an instance.
+    Class c has weights[c], scores[c] and counts[c] rows; its rows are
+    members[offsets[c]:offsets[c + 1]] in tie-break order, so taking k
+    rows of a class means taking the first k of them."""
+
+    __slots__ = ("weights", "scores", "counts", "members", "offsets", "inst")
+
+    def __init__(
+        self,
+        inst: KnapsackInstance,
+        tie_break: str | Sequence | np.ndarray = "position",
+        seed: int = 0,
+    ) -> None:
+        self.inst = inst
+        n = len(inst)
+        # one integer code per (weight, score) pair from two 1-D uniques
+        wv, wc = np.unique(inst.weights, return_inverse=True)
+        sv, sc = np.unique(inst.scores, return_inverse=True)
+        codes, cls, self.counts = np.unique(
+            wc.reshape(-1) * len(sv) + sc.reshape(-1),
+            return_inverse=True, return_counts=True)
+        cls = cls.reshape(-1)
+        self.weights = wv[codes // max(len(sv), 1)]
+        self.scores = sv[codes % max(len(sv), 1)]
+        self.offsets = np.concatenate(([0], np.cumsum(self.counts)))
+
+        if isinstance(tie_break, str) and tie_break == "position":
+            self.members = np.argsort(cls, kind="stable")
+            return
+        if isinstance(tie_break, str):
+            if tie_break == "reverse":
+                key = -np.arange(n)
+            elif tie_break == "random":
+                key = np.random.default_rng(seed).permutation(n)
+            else:
+                raise ValueError(f"unknown tie_break {tie_break!r}")
+        else:
+            key = np.asarray(tie_break)
+            if len(key) != n:
+                raise ValueError("tie_break needs one key per row")
+        # by class, then key; lexsort is stable, so then position
+        self.members = np.lexsort((key, cls))
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def expand(self, take: np.ndarray) -> np.ndarray:
+        """Positions of the first take[c] rows of every class c."""
+        take = np.asarray(take, dtype=np.int64)
+        if not take.any():
+            return np.empty(0, dtype=np.int64)
+        starts = self.offsets[:-1]
+        # ranks of the wanted rows inside their class, one arange overall
+        run = np.repeat(starts - np.cumsum(take) + take, take)
+        return self.members[np.arange(int(take.sum())) + run]
+
+
+def compress(
+    df: pd.DataFrame | KnapsackInstance,
+    tie_break: str | Sequence | np.ndarray = "position",
+    seed: int = 0,
+) -> ItemClasses:
+    """Groups rows into (weight, score) classes. Within a class rows are
+    taken by tie_break: "position" (index order), "reverse", "random"
+    (with seed), or one sort key per row, smallest first (e.g. a column
+    of df); ties fall back to position."""
+    return ItemClasses(as_instance(df), tie_break, seed)
+
+
+def bounded_knapsack(classes: ItemClasses, max_weight: int) -> np.ndarray:
+    """Exact number of rows to take per class (least weight among optimal
+    choices). Counts are split into 1, 2, 4, ... pieces, so the 0-1 DP
+    runs over about sum(log2(count)) items instead of all rows."""
+    cap = max(int(max_weight), 0)
+    w, s = classes.weights, classes.scores
+    take = np.zeros(len(classes), dtype=np.int64)
+    free = (w <= 0) & (s > 0)
+    take[free] = classes.counts[free]
+
+    useful = np.flatnonzero((w > 0) & (s > 0) & (w <= cap))
+    limit = np.minimum(classes.counts[useful], cap // np.maximum(w[useful], 1))
+    if int((limit * w[useful]).sum()) <= cap:
+        take[useful] = limit
+        return take
+
+    cls_list: list[int] = []
+    mult_list: list[int] = []
+    for c, m in zip(useful.tolist(), limit.tolist()):
+        k = 1
+        while m > 0:
+            part = min(k, m)
+            cls_list.append(c)
+            mult_list.append(part)
+            m -= part
+            k *= 2
+    piece_cls = np.asarray(cls_list, dtype=np.int64)
+    piece_mult = np.asarray(mult_list, dtype=np.int64)
+    piece_w = piece_mult * w[piece_cls]
+    piece_s = piece_mult * s[piece_cls]
+
+    best, items, keep = dp_table(piece_w, piece_s, cap)
+    capacity = int(np.argmax(best == best[cap]))
+    for p in dp_backtrack(keep, items, piece_w, capacity):
+        take[piece_cls[p]] += piece_mult[p]
+    return take
+
+
+def greedy_classes(classes: ItemClasses, max_weight: int) -> np.ndarray:
+    """greedy_approach over classes: by ratio desc, score desc, weight
+    asc, as many rows of each class as still fit. With the "position"
+    tie-break this picks the same rows as greedy_approach."""
+    w, s = classes.weights, classes.scores
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = s / w
+    take = np.zeros(len(classes), dtype=np.int64)
+    rem = int(max_weight)
+    for c in np.lexsort((w, -s, -ratio)).tolist():
+        wc = int(w[c])
+        if wc <= 0:
+            take[c] = classes.counts[c]
+        elif wc <= rem:
+            take[c] = min(int(classes.counts[c]), rem // wc)
+            rem -= take[c] * wc
+    return take
+
+
+def compressed_knapsack(
+    df: pd.DataFrame | KnapsackInstance,
+    max_weight: int,
+    *,
+    method: str = "dp",
+    tie_break: str | Sequence | np.ndarray = "position",
+    seed: int = 0,
+) -> Tuple[List[Hashable], float, int]:
+    """Knapsack over (risk_score, weight) classes, expanded back to rows.
+    method "dp" is exact (cost grows with the number of classes and
+    max_weight, not with the number of rows), "greedy" fills classes by
+    ratio. Returns (choice, score, weight)."""
+    classes = compress(df, tie_break, seed)
+    if method == "dp":
+        take = bounded_knapsack(classes, max_weight)
+    elif method == "greedy":
+        take = greedy_classes(classes, max_weight)
+    else:
+        raise ValueError(f"unknown method {method!r}")
+    pos = classes.expand(take)
+    inst = classes.inst
+    total_s = float(inst.scores[pos].sum()) if len(pos) else 0.0
+    total_w = int(inst.weights[pos].sum()) if len(pos) else 0
+    return inst.to_labels(pos), total_s, total_w
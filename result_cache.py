@@ -0,0 +1,281 @@
+"""Memoized solver results: an in-process LRU with an optional on-disk
+tier, keyed by dataset, solver, budget and parameters."""
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from functools import lru_cache, wraps
+from typing import List, Tuple
+import hashlib
+import inspect
+import json
+import os
+import sys
+import tempfile
+import threading
+import types
+import numpy as np
+import pandas as pd
+from instance import KnapsackInstance, as_instance
+from partitioned import resolve_solver
+from scoring import rules_fingerprint
+
+RESULT_DIR = ".cache/results"
+RESULT_FORMAT = 1
+# arguments that do not change the result, and ones that make it
+# run-dependent or expect the solver to run (stats is filled by the run)
+IGNORED_PARAMS = ("workers", "mmap_path")
+UNCACHEABLE_PARAMS = ("time_limit", "rn", "stats")
+
+
+def instance_fingerprint(data: pd.DataFrame | KnapsackInstance) -> str:
+    """Hash of the weights, scores and labels the solvers see."""
+    inst = as_instance(data)
+    h = hashlib.sha256()
+    h.update(np.ascontiguousarray(inst.weights).tobytes())
+    h.update(np.ascontiguousarray(inst.scores).tobytes())
+    labels = np.asarray(inst.labels)
+    if labels.dtype.kind in "iub":
+        h.update(np.ascontiguousarray(labels).tobytes())
+    else:
+        h.update(json.dumps(labels.tolist(), default=repr).encode())
+    return h.hexdigest()
+
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def _local_modules(module: str) -> list[str]:
+    """module and the modules of this package it imports, directly or
+    through each other (e.g. grasp -> local_search, instance, greedy)."""
+    seen: set[str] = set()
+    todo = [module]
+    while todo:
+        name = todo.pop()
+        mod = sys.modules.get(name)
+        file = getattr(mod, "__file__", None)
+        if (name in seen or file is None
+                or os.path.dirname(os.path.abspath(file)) != _ROOT):
+            continue
+        seen.add(name)
+        for value in vars(mod).values():
+            if isinstance(value, types.ModuleType):
+                todo.append(value.__name__)
+            elif isinstance(getattr(value, "__module__", None), str):
+                todo.append(value.__module__)
+    return sorted(seen) or [module]
+
+
+@lru_cache(maxsize=None)
+def _module_fingerprint(module: str) -> str:
+    """Source hash of a solver's module and the package modules it uses,
+    so new solver code (or code it calls) misses."""
+    h = hashlib.sha256()
+    for name in _local_modules(module):
+        try:
+            source = inspect.getsource(sys.modules[name])
+        except (KeyError, OSError, TypeError):
+            source = name
+        h.update(source.encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def normalize_params(solver: Callable, params: dict) -> str | None:
+    """Canonical JSON of all parameters with defaults filled in, or None
+    when the call must not be cached (time limit, own generator, stats
+    to fill, values JSON cannot represent)."""
+    if any(params.get(name) is not None for name in UNCACHEABLE_PARAMS):
+        return None
+    try:
+        bound = inspect.signature(solver).bind(None, 0, **params)
+    except TypeError:
+        return None
+    bound.apply_defaults()
+    args = dict(list(bound.arguments.items())[2:])
+    for name in IGNORED_PARAMS:
+        args.pop(name, None)
+    try:
+        return json.dumps(args, sort_keys=True)
+    except TypeError:
+        return None
+
+
+class ResultCache:
+    """LRU of max_entries results in memory; with disk_dir also JSON files
+    there, evicted least recently used first beyond max_bytes. Keys cover
+    the dataset fingerprint, the scoring rules, the solver and its source,
+    the budget and the normalized parameters, so changing any of them
+    misses instead of returning a stale result. Safe to share between
+    threads (e.g. the selection service's solver threads)."""
+
+    __slots__ = ("max_entries", "disk_dir", "max_bytes", "hits", "misses",
+                 "_lru", "_lock")
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        *,
+        disk_dir: str | None = None,
+        max_bytes: int = 64 << 20,
+    ) -> None:
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        self._lru: OrderedDict[str, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+        fingerprint: str,
+        solver: Callable,
+        max_weight: int,
+        params: str,
+    ) -> str:
+        h = hashlib.sha256()
+        for part in (str(RESULT_FORMAT), fingerprint, rules_fingerprint(),
+                     f"{solver.__module__}.{solver.__qualname__}",
+                     _module_fingerprint(solver.__module__),
+                     str(int(max_weight)), params):
+            h.update(part.encode())
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _file(self, key: str) -> str | None:
+        """key's file in the disk tier, None without one."""
+        if self.disk_dir is None:
+            return None
+        return os.path.join(self.disk_dir, key + ".json")
+
+    def get(self, key: str) -> tuple | None:
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                return self._lru[key]
+        path = self._file(key)
+        if path is None:
+            return None
+        try:
+            with open(path) as f:
+                choice, score, weight = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        result = (choice, score, weight)
+        self._remember(key, result)
+        return result
+
+    def _remember(self, key: str, result: tuple) -> None:
+        with self._lock:
+            self._lru[key] = result
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def put(self, key: str, result: tuple) -> None:
+        self._remember(key, result)
+        path = self._file(key)
+        if path is None:
+            return
+        try:
+            text = json.dumps(list(result))
+        except TypeError:
+            return  # labels JSON cannot hold stay in memory only
+        # a private temporary file per call: threads and processes that
+        # store the same key do not move each other's files away
+        tmp = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(suffix=".tmp",
+                                       dir=os.path.dirname(path))
+            with os.fdopen(fd, "w") as f:
+                f.write(text)
+            os.replace(tmp, path)
+            self.evict()
+        except OSError:
+            # the disk tier is best effort: not storing is a later miss
+            if tmp is not None and os.path.exists(tmp):
+                os.remove(tmp)
+
+    def evict(self) -> None:
+        """Removes the least recently used files beyond max_bytes."""
+        if self.disk_dir is None or not os.path.isdir(self.disk_dir):
+            return
+        files = []
+        for e in os.scandir(self.disk_dir):
+            if e.name.endswith(".json"):
+                try:
+                    st = e.stat()
+                except OSError:
+                    continue  # removed by another thread meanwhile
+                files.append((st.st_mtime, st.st_size, e.path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self) -> None:
+        """Empties both tiers."""
+        with self._lock:
+            self._lru.clear()
+        if self.disk_dir is not None and os.path.isdir(self.disk_dir):
+            for e in os.scandir(self.disk_dir):
+                if e.name.endswith(".json"):
+                    try:
+                        os.remove(e.path)
+                    except FileNotFoundError:
+                        pass
+
+    def solve(
+        self,
+        solver: str | Callable,
+        data: pd.DataFrame | KnapsackInstance,
+        max_weight: int,
+        *,
+        fingerprint: str | None = None,
+        **params: object,
+    ) -> Tuple[List[Hashable], float, int]:
+        """solver(data, max_weight, **params), answered from the cache
+        when the same call was made before. Hashing data costs
+        O(population) per call; callers that solve the same data
+        repeatedly pass its instance_fingerprint once computed."""
+        fn = resolve_solver(solver)
+        norm = normalize_params(fn, params)
+        if norm is None:
+            return fn(data, max_weight, **params)
+        if fingerprint is None:
+            fingerprint = instance_fingerprint(data)
+        key = self.key(fingerprint, fn, max_weight, norm)
+        result = self.get(key)
+        with self._lock:
+            if result is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if result is not None:
+            choice, score, weight = result
+            return list(choice), score, weight
+        choice, score, weight = fn(data, max_weight, **params)
+        self.put(key, (list(choice), score, weight))
+        return choice, score, weight
+
+
+DEFAULT_CACHE = ResultCache()
+
+
+def cached(
+    solver: Callable,
+    cache: ResultCache | None = None,
+) -> Callable:
+    """solver with results memoized in cache (DEFAULT_CACHE if None),
+    e.g. grasp = cached(grasp)."""
+    @wraps(solver)
+    def wrapper(data, max_weight, **params):
+        return (cache or DEFAULT_CACHE).solve(solver, data, max_weight,
+                                              **params)
+    return wrapper
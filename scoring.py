@@ -0,0 +1,199 @@
+"""Table-driven scoring rules for risk_score and weight."""
+from bisect import bisect_right
+from collections.abc import Mapping, Sequence
+import hashlib
+import json
+import numpy as np
+
+# Age bands: points for ages below the first edge, then from each edge on.
+RISK_AGE_EDGES = (20, 30, 40, 50)
+RISK_AGE_POINTS = (0, 1, 2, 3, 2)
+
+WEIGHT_AGE_EDGES = (16, 25, 56)
+WEIGHT_AGE_POINTS = (0, 1, 2, 2)
+
+# Column -> (points per lower-cased category, points for anything else).
+RISK_POINTS: dict[str, tuple[dict[str, int], int]] = {
+    "Education": ({
+        'primary': 2,
+        'none': 1,
+        'tertiary': 1,
+        'secondary': 0,
+        'unknown': 0,
+    }, 0),
+    "Employment": ({
+        'unemployed': 3,
+        'semi employed': 1,
+        'employed': 0,
+        'unknown': 0,
+    }, 0),
+    "Marital status": ({
+        'married': 3,
+        'unmarried': 0,
+        'unknown': 0,
+    }, 0),
+    "Income": ({
+        'no_income': 3,
+        'very_low': 2,
+        'low': 1,
+        'middle': -1,
+        'upper_middle': -2,
+        'high': -3,
+        'unknown': 0,
+    }, 0),
+}
+
+WEIGHT_POINTS: dict[str, tuple[dict[str, int], int]] = {
+    "Education": ({
+        'none': 1,
+        'primary': 1,
+        'secondary': 1,
+        'tertiary': 0,
+        'unknown': 0,
+    }, 0),
+    "Employment": ({
+        'unemployed': 2,
+        'semi employed': 1,
+        'employed': 0,
+        'unknown': 0,
+    }, 0),
+    "Marital status": ({
+        'married': 1,
+        'unmarried': 0,
+        'unknown': 0,
+    }, 0),
+    "Income": ({
+        'no_income': 2,
+        'very_low': 2,
+        'low': 1,
+        'middle': 0,
+        'upper_middle': 0,
+        'high': 0,
+        'unknown': 1,
+    }, 1),
+}
+
+# (required categories, points) added when every category matches.
+RISK_INTERACTIONS: tuple[tuple[dict[str, str], int], ...] = (
+    ({"Marital status": "married", "Income": "no_income"}, 2),
+)
+
+WEIGHT_INTERACTIONS: tuple[tuple[dict[str, str], int], ...] = (
+    ({"Marital status": "married", "Income": "no_income"}, -1),
+)
+
+MIN_WEIGHT = 1
+
+RISK_RULES = (RISK_AGE_EDGES, RISK_AGE_POINTS, RISK_POINTS, RISK_INTERACTIONS)
+WEIGHT_RULES = (WEIGHT_AGE_EDGES, WEIGHT_AGE_POINTS, WEIGHT_POINTS,
+                WEIGHT_INTERACTIONS)
+
+SCORED_COLUMNS = ("Education", "Employment", "Marital status", "Income")
+
+
+def rules_fingerprint() -> str:
+    """Stable hash of every scoring table; changes whenever a rule does."""
+    payload = json.dumps([RISK_RULES, WEIGHT_RULES, MIN_WEIGHT],
+                         sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def row_age(value: object) -> int:
+    """Age as used by the rules, -1 when it is not a number."""
+    try:
+        return int(value)  # type: ignore[call-overload]
+    except (ValueError, TypeError):
+        return -1
+
+
+def row_points(row: Mapping, rules: tuple) -> int:
+    """Points of one row under RISK_RULES or WEIGHT_RULES."""
+    edges, age_points, tables, interactions = rules
+    total = age_points[bisect_right(edges, row_age(row["Age"]))]
+    for col, (points, default) in tables.items():
+        total += points.get(str(row[col]).lower(), default)
+    for cond, delta in interactions:
+        if all(str(row[c]).lower() == v for c, v in cond.items()):
+            total += delta
+    return total
+
+
+def compile_lookup(categories: Sequence, points: dict[str, int],
+                   default: int) -> np.ndarray:
+    """Points per category code. The extra last slot serves code -1
+    (missing value), which the row rules see as 'nan'."""
+    lut = np.empty(len(categories) + 1, dtype=np.int64)
+    for code, cat in enumerate(categories):
+        lut[code] = points.get(str(cat).lower(), default)
+    lut[-1] = points.get("nan", default)
+    return lut
+
+
+def compile_match(categories: Sequence, value: str) -> np.ndarray:
+    """Boolean per category code (plus missing slot) for value."""
+    lut = np.zeros(len(categories) + 1, dtype=bool)
+    for code, cat in enumerate(categories):
+        lut[code] = str(cat).lower() == value
+    lut[-1] = value == "nan"
+    return lut
+
+
+def age_band_points(age: np.ndarray, edges: Sequence[int],
+                    age_points: Sequence[int]) -> np.ndarray:
+    """Vectorized age band lookup; non-finite ages count as -1."""
+    age = np.asarray(age, dtype=np.float64)
+    age = np.where(np.isfinite(age), np.trunc(age), -1.0)
+    band = np.searchsorted(np.asarray(edges, dtype=np.float64), age,
+                           side="right")
+    return np.asarray(age_points, dtype=np.int64)[band]
+
+
+def column_points(
+    age: np.ndarray,
+    codes: Mapping[str, np.ndarray],
+    categories: Mapping[str, Sequence],
+    rules: tuple,
+) -> np.ndarray:
+    """Vectorized row_points over ages and categorical codes.
+    codes[col] indexes categories[col], -1 marks a missing value."""
+    edges, age_points, tables, interactions = rules
+    total = age_band_points(age, edges, age_points)
+    for col, (points, default) in tables.items():
+        total += compile_lookup(categories[col], points, default)[codes[col]]
+    for cond, delta in interactions:
+        mask = np.ones(len(total), dtype=bool)
+        for col, value in cond.items():
+            mask &= compile_match(categories[col], value)[codes[col]]
+        total += delta * mask
+    return total
+
+
+def score_codes(
+    age: np.ndarray,
+    codes: Mapping[str, np.ndarray],
+    categories: Mapping[str, Sequence],
+) -> tuple[np.ndarray, np.ndarray]:
+    """Computes (risk_score, weight) from ages and categorical codes."""
+    risk = column_points(age, codes, categories, RISK_RULES)
+    weight = column_points(age, codes, categories, WEIGHT_RULES)
+    np.maximum(weight, MIN_WEIGHT, out=weight)
+    return risk, weight
+
+
+def score_frame(df) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorized (risk_score, weight) for a cleaned DataFrame.
+    Each scored column is factorized once, so the string work is per
+    distinct value instead of per row."""
+    codes: dict[str, np.ndarray] = {}
+    categories: dict[str, Sequence] = {}
+    for col in SCORED_COLUMNS:
+        col_codes, uniques = df[col].factorize()
+        missing = col_codes < 0
+        if missing.any():
+            # None, NaN and NA are one sentinel to factorize, but not to str()
+            extra_codes, extra = df[col][missing].map(str).factorize()
+            col_codes[missing] = extra_codes + len(uniques)
+            uniques = list(uniques) + list(extra)
+        codes[col], categories[col] = col_codes, uniques
+    age = np.asarray(df["Age"], dtype=np.float64)
+    return score_codes(age, codes, categories)
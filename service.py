@@ -0,0 +1,335 @@
+"""Resident selection service: the prepared dataset stays in memory and
+selection requests are answered over local HTTP.
+
+python service.py --data data.csv --port 8765
+curl -d '{"budget": 51, "algorithm": "greedy"}' localhost:8765/select
+"""
+from collections.abc import Hashable, Iterable, Mapping, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, List, Tuple
+import argparse
+import json
+import queue
+import threading
+import time
+import urllib.request
+import numpy as np
+import pandas as pd
+from dataset_cache import prepare_dataset_cached
+from dynamic_programming import CapacityFrontier
+from greedy import greedy_multi_capacity
+from instance import KnapsackInstance
+from partitioned import resolve_solver
+from result_cache import RESULT_DIR, ResultCache, instance_fingerprint
+
+# largest DP the dispatcher runs: candidate items x (budget + 1) cells
+# (the keep table holds one bit per cell and stays cached)
+MAX_DP_CELLS = 50_000_000
+
+
+class SelectionService:
+    """Holds one prepared dataset and answers selection requests.
+    Requests are queued and a dispatcher thread takes them in batches
+    (all that arrive within batch_window seconds): greedy requests share
+    one sort (greedy_multi_capacity) and DP requests one capacity frontier
+    for the largest budget, which is kept for later requests. DP budgets
+    whose table would exceed max_dp_cells are solved by branch_and_bound
+    instead. That and all other algorithms run with their parameters on
+    slow_workers threads, off the dispatcher, so greedy and DP batches are
+    not held up by them; they go through cache (an in-memory ResultCache
+    unless one is given), so repeated requests are not solved again."""
+
+    def __init__(
+        self,
+        data: str | pd.DataFrame = "data.csv",
+        *,
+        batch_window: float = 0.005,
+        cache: ResultCache | None = None,
+        max_dp_cells: int = MAX_DP_CELLS,
+        slow_workers: int = 1,
+    ) -> None:
+        self.df = (prepare_dataset_cached(data) if isinstance(data, str)
+                   else data)
+        self.inst = KnapsackInstance.from_frame(self.df)
+        self.batch_window = batch_window
+        self.cache = cache if cache is not None else ResultCache()
+        # the data never changes, so it is hashed once for the cache keys
+        self.fingerprint = instance_fingerprint(self.inst)
+        self.max_dp_cells = max_dp_cells
+        # only these enter the DP table (see dp_table)
+        self._dp_items = int(np.count_nonzero(self.inst.scores > 0))
+        self._frontier: CapacityFrontier | None = None
+        self._slow = ThreadPoolExecutor(max_workers=max(1, slow_workers))
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        budget: int,
+        algorithm: str = "greedy",
+        params: Mapping | None = None,
+    ) -> Future:
+        """Queues one request; the future resolves to
+        (choice, score, weight)."""
+        fut: Future = Future()
+        self._queue.put((int(budget), algorithm, dict(params or {}), fut))
+        return fut
+
+    def select(
+        self,
+        budget: int,
+        algorithm: str = "greedy",
+        params: Mapping | None = None,
+    ) -> Tuple[List[Hashable], float, int]:
+        return self.submit(budget, algorithm, params).result()
+
+    def close(self) -> None:
+        """Stops the dispatcher after the queued requests."""
+        self._queue.put(None)
+        self._thread.join()
+        self._slow.shutdown()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            until = time.monotonic() + self.batch_window
+            while True:
+                try:
+                    item = self._queue.get(
+                        timeout=max(0.0, until - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._process(batch)
+                    return
+                batch.append(item)
+            self._process(batch)
+
+    def _process(self, batch: list) -> None:
+        greedy: list[tuple] = []
+        dp: list[tuple] = []
+        rest: list[tuple] = []
+        for req in batch:
+            budget, algorithm, params, fut = req
+            if algorithm == "greedy" and not params:
+                greedy.append(req)
+            elif algorithm == "dynamic_programming" and not params:
+                if self._dp_items * (budget + 1) <= self.max_dp_cells:
+                    dp.append(req)
+                else:
+                    # also exact, without a table of that size
+                    rest.append((budget, "branch_and_bound", {}, fut))
+            else:
+                rest.append(req)
+
+        if greedy:
+            results: Sequence[object]
+            try:
+                results = greedy_multi_capacity(
+                    self.inst, [budget for budget, *_ in greedy])
+            except Exception as exc:
+                # a solver failure fails these futures, not the batcher
+                results = [exc] * len(greedy)
+            for (_, _, _, fut), res in zip(greedy, results):
+                _resolve(fut, res)
+
+        if dp:
+            try:
+                top = max(budget for budget, *_ in dp)
+                if self._frontier is None or self._frontier.max_weight < top:
+                    self._frontier = CapacityFrontier(self.inst, top)
+                for budget, _, _, fut in dp:
+                    _resolve(fut, _call(self._frontier.select, budget))
+            except Exception as exc:
+                # likewise: every waiting caller gets the error
+                for *_, fut in dp:
+                    _resolve(fut, exc)
+
+        for req in rest:
+            self._slow.submit(self._solve, *req)
+
+    def _solve(self, budget: int, algorithm: str, params: dict,
+               fut: Future) -> None:
+        try:
+            solver = resolve_solver(algorithm)
+        except KeyError:
+            _resolve(fut, ValueError(f"unknown algorithm {algorithm!r}"))
+            return
+        _resolve(fut, _call(self.cache.solve, solver, self.inst, budget,
+                            fingerprint=self.fingerprint, **params))
+
+
+def _call(fn, *args, **kwargs) -> object:
+    try:
+        return fn(*args, **kwargs)
+    except Exception as exc:
+        # returned, so _resolve sets it on the caller's future
+        return exc
+
+
+def _resolve(fut: Future, result: object) -> None:
+    if isinstance(result, Exception):
+        fut.set_exception(result)
+    else:
+        fut.set_result(result)
+
+
+def _answer(result: Tuple[List[Hashable], float, int],
+            started: float) -> dict:
+    choice, score, weight = result
+    return {"choice": list(choice), "score": score, "weight": weight,
+            "elapsed": time.perf_counter() - started}
+
+
+def handle_requests(
+    service: SelectionService,
+    requests: Sequence[Mapping],
+) -> list[dict]:
+    """Submits all requests before waiting, so they batch together.
+    Each request is {"budget", "algorithm", "params"}; each answer is
+    {"choice", "score", "weight", "elapsed"} or {"error"}."""
+    started = time.perf_counter()
+    futures: list[Future | Exception] = []
+    for req in requests:
+        try:
+            futures.append(service.submit(
+                req["budget"], req.get("algorithm", "greedy"),
+                req.get("params")))
+        except (KeyError, TypeError, ValueError) as exc:
+            futures.append(exc)
+    out = []
+    for fut in futures:
+        if isinstance(fut, Exception):
+            out.append({"error": repr(fut)})
+            continue
+        try:
+            out.append(_answer(fut.result(), started))
+        except Exception as exc:
+            # a failed solve becomes an error entry in the answer
+            out.append({"error": repr(exc)})
+    return out
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service: SelectionService
+
+    def _send(self, status: int, body: object) -> None:
+        data = json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._send(200, {"rows": len(self.service.inst)})
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        if self.path != "/select":
+            self._send(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as exc:
+            self._send(400, {"error": repr(exc)})
+            return
+        if not isinstance(body, (dict, list)):
+            self._send(400, {"error": "expected a request object or a "
+                                      "list of them"})
+            return
+        if isinstance(body, dict):
+            self._send(200, handle_requests(self.service, [body])[0])
+        else:
+            self._send(200, handle_requests(self.service, body))
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def make_server(
+    service: SelectionService,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+) -> ThreadingHTTPServer:
+    """HTTP server for service (call serve_forever(); port 0 picks a
+    free port, see server_address)."""
+    handler = type("Handler", (_Handler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+class SelectionClient:
+    """Client for a running service (HTTP)."""
+
+    def __init__(self, url: str = "http://127.0.0.1:8765") -> None:
+        self.url = url.rstrip("/")
+
+    def _post(self, body: object) -> Any:
+        req = urllib.request.Request(
+            self.url + "/select", data=json.dumps(body).encode(),
+            headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req) as resp:
+            return json.loads(resp.read())
+
+    def select(self, budget: int, algorithm: str = "greedy",
+               params: Mapping | None = None) -> dict:
+        return self._post({"budget": budget, "algorithm": algorithm,
+                           "params": dict(params or {})})
+
+    def select_many(self, requests: Iterable[Mapping]) -> list[dict]:
+        """Several requests in one round trip (batched by the service)."""
+        return self._post(list(requests))
+
+
+class LocalClient:
+    """Stand-in for SelectionClient that calls a SelectionService in the
+    same process, with the same answers (for tests and notebooks)."""
+
+    def __init__(self, service: SelectionService) -> None:
+        self.service = service
+
+    def select(self, budget: int, algorithm: str = "greedy",
+               params: Mapping | None = None) -> dict:
+        return self.select_many([{"budget": budget, "algorithm": algorithm,
+                                  "params": params}])[0]
+
+    def select_many(self, requests: Iterable[Mapping]) -> list[dict]:
+        answers = handle_requests(self.service, list(requests))
+        return json.loads(json.dumps(answers, default=str))
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default="data.csv")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--batch-window", type=float, default=0.005)
+    parser.add_argument("--result-cache", nargs="?", const=RESULT_DIR,
+                        help=f"keep results on disk (default {RESULT_DIR})")
+    args = parser.parse_args(argv)
+
+    service = SelectionService(
+        args.data, batch_window=args.batch_window,
+        cache=ResultCache(disk_dir=args.result_cache))
+    server = make_server(service, args.host, args.port)
+    print(f"serving {len(service.inst)} rows on "
+          f"http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Sharing an instance's arrays with worker processes."""
+from __future__ import annotations
+from collections.abc import Iterator, Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Any
+from multiprocessing import shared_memory
+import mmap
+import os
+import numpy as np
+from instance import KnapsackInstance
+
+
+class SharedArrays:
+    """Named 1-D arrays (stored as int64 or float64) in one shared-memory
+    block, or in one memory-mapped file when path is given. The creating
+    process owns the storage; workers attach with attach_arrays(handle)
+    and read it in place, so attaching costs the same for any size and
+    the data is in memory once however many workers there are."""
+
+    __slots__ = ("layout", "path", "_shm", "_mmap", "_buf", "_owner")
+    layout: tuple[tuple[str, str, int, int], ...]
+    path: str | None
+    _shm: shared_memory.SharedMemory | None
+    _mmap: mmap.mmap | None
+    _buf: memoryview
+    _owner: bool
+
+    def __init__(
+        self,
+        arrays: Mapping[str, Sequence[float] | np.ndarray],
+        *,
+        path: str | None = None,
+    ) -> None:
+        layout, offset, data = [], 0, []
+        for name, values in arrays.items():
+            values = np.asarray(values)
+            dtype = np.dtype(np.float64 if values.dtype.kind == "f"
+                             else np.int64)
+            layout.append((name, dtype.str, offset, len(values)))
+            data.append(values)
+            offset += dtype.itemsize * len(values)
+        self.layout = tuple(layout)
+        self.path = path
+        self._owner = True
+        self._open(max(1, offset), create=True)
+        for (name, fmt, off, n), values in zip(self.layout, data):
+            np.ndarray((n,), dtype=fmt, buffer=self._buf,
+                       offset=off)[:] = values
+
+    def _open(self, size: int, create: bool) -> None:
+        self._shm = self._mmap = None
+        if self.path is None:
+            shm = shared_memory.SharedMemory(create=True, size=size)
+            # SharedMemory.buf is None only after shm.close()
+            self._shm, self._buf = shm, shm.buf  # type: ignore[assignment]
+            return
+        if create:
+            with open(self.path, "wb") as f:
+                f.truncate(size)
+        with open(self.path, "r+b" if create else "rb") as f:
+            self._mmap = mmap.mmap(
+                f.fileno(), 0,
+                access=mmap.ACCESS_WRITE if create else mmap.ACCESS_READ)
+        self._buf = memoryview(self._mmap)
+
+    @classmethod
+    def attach(cls, handle: tuple) -> "SharedArrays":
+        """Read-only view of published arrays (see handle)."""
+        self = cls.__new__(cls)
+        kind, where, self.layout = handle
+        self._owner = False
+        if kind == "file":
+            self.path = where
+            self._open(0, create=False)
+        else:
+            self.path = None
+            shm = shared_memory.SharedMemory(name=where)
+            self._shm, self._mmap = shm, None
+            self._buf = shm.buf.toreadonly()  # type: ignore[union-attr]
+        return self
+
+    @property
+    def handle(self) -> tuple:
+        """Picklable (backend, block name or file path, layout)."""
+        if self._shm is not None:
+            return "shm", self._shm.name, self.layout
+        return "file", self.path, self.layout
+
+    def _entry(self, name: str) -> tuple[str, str, int, int]:
+        for entry in self.layout:
+            if entry[0] == name:
+                return entry
+        raise KeyError(name)
+
+    def __contains__(self, name: str) -> bool:
+        return any(entry[0] == name for entry in self.layout)
+
+    def array(self, name: str) -> np.ndarray:
+        """NumPy view of one array (read-only unless this process owns
+        the storage)."""
+        _, dtype, off, n = self._entry(name)
+        return np.ndarray((n,), dtype=dtype, buffer=self._buf, offset=off)
+
+    def sequence(self, name: str) -> memoryview[Any]:
+        """One array as a memoryview: indexing gives Python ints/floats as
+        fast as a list does, without the list."""
+        _, dtype, off, n = self._entry(name)
+        view = self._buf[off:off + 8 * n]  # both stored dtypes are 8 bytes
+        return view.cast("d") if dtype == "<f8" else view.cast("q")
+
+    def close(self) -> None:
+        """Releases the storage; the owner also removes it. Views handed
+        out must be gone by then."""
+        self._buf.release()
+        if self._shm is not None:
+            self._shm.close()
+            if self._owner:
+                self._shm.unlink()
+        if self._mmap is not None:
+            self._mmap.close()
+            if self._owner and self.path is not None:
+                os.remove(self.path)
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class SharedInstance(SharedArrays):
+    """An instance published as SharedArrays: weights, scores, ratios and
+    integer label codes (the index itself when it is integer, else
+    positions), plus any extra arrays (e.g. a precomputed item order).
+    Workers rebuild it with attach_instance(handle) instead of receiving
+    pickled arrays."""
+
+    __slots__ = ()
+
+    def __init__(
+        self,
+        inst: KnapsackInstance,
+        *,
+        path: str | None = None,
+        extra: Mapping[str, Sequence[float] | np.ndarray] | None = None,
+    ) -> None:
+        labels = np.asarray(inst.labels)
+        if labels.dtype.kind not in "iu":
+            labels = np.arange(len(inst))
+        arrays: dict[str, Sequence[float] | np.ndarray] = {
+            "weights": inst.weights, "scores": inst.scores,
+            "ratios": inst.ratios, "labels": labels}
+        arrays.update(extra or {})
+        super().__init__(arrays, path=path)
+
+
+def attach_arrays(handle: tuple) -> SharedArrays:
+    """Attaches to arrays published by SharedArrays (read-only)."""
+    return SharedArrays.attach(handle)
+
+
+def attach_instance(
+    handle: tuple,
+) -> tuple[SharedArrays, KnapsackInstance]:
+    """Attaches to a published instance; keep the returned SharedArrays
+    alive as long as the instance is used. Labels are the label codes."""
+    shared = SharedArrays.attach(handle)
+    inst = KnapsackInstance(
+        shared.array("weights"), shared.array("scores"),
+        shared.array("labels"), ratios=shared.array("ratios"))
+    return shared, inst
+
+
+def pool_workers(workers: int | None, tasks: int) -> int:
+    """Processes for tasks independent jobs: 0 (run serially) unless
+    workers > 1 and there is more than one task."""
+    if workers is None or workers <= 1 or tasks <= 1:
+        return 0
+    return min(workers, tasks)
+
+
+# per-process state of pool workers started by instance_pool
+WORKER: dict = {}
+
+
+def _init_worker(handle: tuple, state: dict,
+                 sequences: tuple[str, ...]) -> None:
+    """Pool initializer: attach to the published instance once per
+    worker and keep it, its memoryviews and state in WORKER."""
+    shared, inst = attach_instance(handle)
+    WORKER.update(state, shared=shared, inst=inst)
+    WORKER.update((name, shared.sequence(name)) for name in sequences)
+
+
+@contextmanager
+def instance_pool(
+    inst: KnapsackInstance,
+    workers: int | None,
+    tasks: int,
+    state: Mapping | None = None,
+    *,
+    sequences: Sequence[str] = (),
+    path: str | None = None,
+    extra: Mapping[str, Sequence[float] | np.ndarray] | None = None,
+) -> Iterator[tuple[ProcessPoolExecutor | None, SharedArrays | None]]:
+    """(pool, shared) for tasks jobs over inst, or (None, None) when they
+    should run serially (see pool_workers). inst (plus extra arrays) is
+    published as a SharedInstance, in a memory-mapped file at path if
+    given, and every worker finds in WORKER the attached "shared" and
+    "inst", the state entries and a memoryview per name in sequences.
+    Pool and storage are released on exit."""
+    n = pool_workers(workers, tasks)
+    if not n:
+        yield None, None
+        return
+    with SharedInstance(
+        inst, path=path, extra=extra,
+    ) as shared, ProcessPoolExecutor(
+        max_workers=n,
+        initializer=_init_worker,
+        initargs=(shared.handle, dict(state or {}), tuple(sequences)),
+    ) as pool:
+        yield pool, shared
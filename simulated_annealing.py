@@ -1,31 +1,225 @@
 """Simulated Annealing for 0-1 knapsack (women)."""
-from collections.abc import Hashable
-from typing import Iterable, Tuple, List
+from __future__ import annotations
+from collections.abc import Hashable, Iterator, Sequence
+from typing import TYPE_CHECKING, Iterable, Tuple, List
+import heapq
 import random
 import math
-import pandas as pd
+import time
+import numpy as np
+from instance import KnapsackInstance, as_instance, deadline_after
+from instrumentation import SolverStats
+from shared import WORKER, instance_pool, pool_workers
 
+if TYPE_CHECKING:
+    import pandas as pd
 
-def ratio(r: dict, w: dict, j: Hashable) -> float:
+
+def ratio(r: Sequence, w: Sequence, j: int) -> float:
     """Risk/weight ratio, with weight at least 1 to avoid div by 0."""
     return float(r[j]) / max(int(w[j]), 1)
 
 
-def greedy_like_outside(outside: list[Hashable], r: dict,
-                        w: dict, k: int) -> list[Hashable]:
-    """Top-k outside by ratio."""
-    return sorted(outside, key=lambda j: ratio(r, w, j), reverse=True)[:k]
+class AnnealingChain:
+    """One SA chain over item positions.
+    Items are ranked once by ratio (ties by position). Outside candidates
+    are flags over that ranking, so the top-k scan skips inside items in C,
+    and the worst inside item is the top of a lazily cleaned heap. Moves
+    are evaluated as deltas and applied in place; the best solution is
+    copied only when it improves. The ranking and the index structures
+    are built by the first sweep, so a chain that never sweeps (its
+    deadline passed during setup) costs no O(n) work."""
+
+    __slots__ = ("w", "r", "max_weight", "top_k", "rn", "order", "rank",
+                 "out_flags", "in_heap", "indexed", "chosen", "tw", "ts",
+                 "best", "best_s", "best_w", "proposed", "accepted")
+
+    def __init__(
+        self,
+        w: list[int],
+        r: list[float],
+        order: list[int],
+        max_weight: int,
+        chosen: set[int],
+        rn: random.Random,
+        top_k: int = 40,
+        rank: Sequence[int] | None = None,
+    ) -> None:
+        self.w, self.r = w, r
+        self.max_weight, self.top_k, self.rn = max_weight, top_k, rn
+        self.order = order
+        self.rank = rank if rank is not None else []
+        self.out_flags = bytearray()
+        self.in_heap: list[int] = []
+        self.indexed = False
+        self.chosen = set(chosen)
+        self.tw = sum(w[i] for i in self.chosen)
+        self.ts = sum(r[i] for i in self.chosen)
+        self.best = list(self.chosen)
+        self.best_s, self.best_w = self.ts, self.tw
+        self.proposed = self.accepted = 0
 
+    def _reindex(self) -> None:
+        """Rebuilds the outside flags and the inside heap from chosen."""
+        if len(self.rank) != len(self.order):
+            self.rank = rank_of(self.order)
+        self.indexed = True
+        flags = np.asarray(self.r)[self.order] > 0
+        flags[[self.rank[i] for i in self.chosen]] = False
+        self.out_flags = bytearray(flags.astype(np.uint8).tobytes())
+        self.in_heap = [-self.rank[i] for i in self.chosen]
+        heapq.heapify(self.in_heap)
+
+    def reset(self, chosen: Iterable[int]) -> None:
+        """Replaces the current solution (best is kept)."""
+        self.chosen = set(chosen)
+        self.tw = sum(self.w[i] for i in self.chosen)
+        self.ts = sum(self.r[i] for i in self.chosen)
+        self._reindex()
+
+    def worst_inside(self) -> int | None:
+        """Worst inside by ratio (or None if empty)."""
+        heap = self.in_heap
+        while heap:
+            i = self.order[-heap[0]]
+            if i in self.chosen:
+                return i
+            heapq.heappop(heap)
+        return None
 
-def worst_inside(chosen: list[Hashable], r: dict, w: dict) -> Hashable | None:
-    """Worst inside by ratio (or None if empty)."""
-    if not chosen:
+    def first_fit(self, limit: int) -> int | None:
+        """First of the top-k outside items (by ratio) with weight <= limit."""
+        flags, order, w = self.out_flags, self.order, self.w
+        at = flags.find(1)
+        for _ in range(self.top_k):
+            if at < 0:
+                return None
+            j = order[at]
+            if w[j] <= limit:
+                return j
+            at = flags.find(1, at + 1)
         return None
-    return min(chosen, key=lambda i: ratio(r, w, i))
+
+    def _add(self, j: int) -> None:
+        self.chosen.add(j)
+        self.out_flags[self.rank[j]] = 0
+        heapq.heappush(self.in_heap, -self.rank[j])
+
+    def _drop(self, i: int) -> None:
+        self.chosen.discard(i)
+        if self.r[i] > 0:
+            self.out_flags[self.rank[i]] = 1
+
+    def sweep(
+        self,
+        temp: float,
+        iters: int,
+        deadline: float | None = None,
+    ) -> bool:
+        """iters moves (+ or 1 swap 1) at temperature temp, fewer when the
+        deadline (time.monotonic() value, checked every 256 moves) passes.
+        Returns whether any move was accepted; proposed and accepted hold
+        the move counts of this sweep."""
+        if not self.indexed:
+            self._reindex()
+        rn, w, r = self.rn, self.w, self.r
+        accept_temp = False
+        skipped = accepted = 0
+        for k in range(iters):
+            if (deadline is not None and not k & 255
+                    and time.monotonic() > deadline):
+                iters = k
+                break
+            worst_in = self.worst_inside()
+            if (rn.random() < 0.5) or (worst_in is None):
+                j = self.first_fit(self.max_weight - self.tw)
+                if j is None:
+                    skipped += 1
+                    continue
+                i = None
+                cand_s, cand_w = self.ts + r[j], self.tw + w[j]
+            else:
+                i = worst_in
+                j = self.first_fit(self.max_weight - self.tw + w[i])
+                if j is None:
+                    skipped += 1
+                    continue
+                cand_s = self.ts - r[i] + r[j]
+                cand_w = self.tw - w[i] + w[j]
+
+            dE = self.ts - cand_s
+            if dE <= 0 or rn.random() < math.exp(-dE / temp):
+                if i is not None:
+                    self._drop(i)
+                self._add(j)
+                self.ts, self.tw = cand_s, cand_w
+                accept_temp = True
+                accepted += 1
+
+                if (self.ts > self.best_s) or (
+                        self.ts == self.best_s and self.tw < self.best_w):
+                    self.best = list(self.chosen)
+                    self.best_s, self.best_w = self.ts, self.tw
+
+        # drop stale heap entries once they outnumber the live ones
+        if len(self.in_heap) > 4 * len(self.chosen) + 64:
+            self.in_heap = [-self.rank[i] for i in self.chosen]
+            heapq.heapify(self.in_heap)
+        self.proposed, self.accepted = iters - skipped, accepted
+        return accept_temp
+
+
+def ratio_order(inst: KnapsackInstance) -> list[int]:
+    """Positions by ratio desc, ties by position."""
+    return np.lexsort((np.arange(len(inst)), -inst.ratios)).tolist()
+
+
+def rank_of(order: Sequence[int]) -> list[int]:
+    """rank[j] = where position j stands in order."""
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[np.asarray(order)] = np.arange(len(order))
+    return rank.tolist()
+
+
+def start_solution(
+    w: list[int],
+    r: list[float],
+    order: list[int],
+    max_weight: int,
+    start: Iterable[int] | None,
+    deadline: float | None = None,
+) -> set[int]:
+    """Greedy start by ratio, or start repaired to fit max_weight. Once
+    the deadline passes the greedy fill stops where it is (it fits),
+    after at least the first 4096 candidates."""
+    if start is None:
+        chosen: set[int] = set()
+        tw = 0
+        for k, j in enumerate(order):
+            if (deadline is not None and k and not k & 4095
+                    and time.monotonic() > deadline):
+                break
+            wj, rj = w[j], r[j]
+            if rj <= 0:
+                continue
+            if tw + wj <= max_weight:
+                chosen.add(j)
+                tw += wj
+        return chosen
+
+    chosen = set(start)
+    tw = sum(w[i] for i in chosen)
+    if tw > max_weight:
+        for i in sorted(list(chosen), key=lambda j: ratio(r, w, j)):
+            if tw <= max_weight:
+                break
+            chosen.discard(i)
+            tw -= w[i]
+    return chosen
 
 
 def simulated_annealing(
-    df: pd.DataFrame,
+    df: pd.DataFrame | KnapsackInstance,
     max_weight: int,
     *,
     start_choice: Iterable[Hashable] | None = None,
@@ -36,95 +230,107 @@ def simulated_annealing(
     iters_per_T: int = 120,
     top_k: int = 40,
     patience_temps: int = 3,
+    stats: SolverStats | None = None,
+    time_limit: float | None = None,
 ) -> Tuple[List[Hashable], float, int]:
     """Simulated Annealing for 0-1 knapsack problem (women).
     Uses moves + and 1 swap 1.
     If start_choice is None, a greedy solution is used as the starting point.
+    stats (optional) gets move counters, the sa.total timer and one
+    sa.temperature event (acceptance rate, current and best score) per
+    temperature. With time_limit (seconds) the schedule stops early and
+    the best solution so far is returned. The limit is checked while the
+    greedy start is built and every 256 moves; only the ratio sort and
+    the list conversions before it run regardless, so a very large
+    instance can overrun a tiny limit by their cost.
     Returns (choice, score, weight)."""
+    inst = as_instance(df)
+    for chain in _anneal(inst, max_weight, start_choice, seed, T0, Tmin,
+                         alpha, iters_per_T, top_k, patience_temps, stats,
+                         deadline_after(time_limit)):
+        pass
+    return (inst.to_labels(chain.best), float(chain.best_s),
+            int(chain.best_w))
 
+
+def iter_simulated_annealing(
+    df: pd.DataFrame | KnapsackInstance,
+    max_weight: int,
+    *,
+    start_choice: Iterable[Hashable] | None = None,
+    seed: int = 42,
+    T0: float = 10.0,
+    Tmin: float = 1e-3,
+    alpha: float = 0.97,
+    iters_per_T: int = 120,
+    top_k: int = 40,
+    patience_temps: int = 3,
+    stats: SolverStats | None = None,
+    time_limit: float | None = None,
+) -> Iterator[Tuple[List[Hashable], float, int]]:
+    """simulated_annealing as a generator: yields the start solution and
+    then the best one after every temperature that improved it. The last
+    one yielded is what simulated_annealing returns."""
+    inst = as_instance(df)
+    best = None
+    for chain in _anneal(inst, max_weight, start_choice, seed, T0, Tmin,
+                         alpha, iters_per_T, top_k, patience_temps, stats,
+                         deadline_after(time_limit)):
+        if best != (chain.best_s, chain.best_w):
+            best = chain.best_s, chain.best_w
+            yield (inst.to_labels(chain.best), float(chain.best_s),
+                   int(chain.best_w))
+
+
+def _anneal(
+    inst: KnapsackInstance,
+    max_weight: int,
+    start_choice: Iterable[Hashable] | None,
+    seed: int,
+    T0: float,
+    Tmin: float,
+    alpha: float,
+    iters_per_T: int,
+    top_k: int,
+    patience_temps: int,
+    stats: SolverStats | None,
+    deadline: float | None,
+) -> Iterator[AnnealingChain]:
+    """Runs the schedule, yielding the chain at the start and after every
+    temperature that improved its best solution."""
     rn = random.Random(seed)
-    w = df["weight"].astype(int).to_dict()
-    r = df["risk_score"].astype(float).to_dict()
-    all_ids = list(df.index)
-
-    if start_choice is None:
-        ids = sorted(all_ids, key=lambda j: ratio(r, w, j), reverse=True)
-        chosen: set[Hashable] = set()
-        tw, ts = 0, 0.0
-        for j in ids:
-            wj, rj = w[j], r[j]
-            if rj <= 0:
-                continue
-            if tw + wj <= max_weight:
-                chosen.add(j)
-                tw += wj
-                ts += rj
-    else:
-        chosen = set(start_choice)
-        tw = sum(w[i] for i in chosen)
-        ts = sum(r[i] for i in chosen)
-        if tw > max_weight:
-            for i in sorted(list(chosen), key=lambda j: ratio(r, w, j)):
-                if tw <= max_weight:
-                    break
-                chosen.discard(i)
-                tw -= w[i]
-                ts -= r[i]
-
-    best = list(chosen)
-    best_w, best_s = tw, ts
+    w = inst.weights.tolist()
+    r = inst.scores.tolist()
+    order = ratio_order(inst)
+
+    start = None if start_choice is None else inst.positions(start_choice)
+    chain = AnnealingChain(
+        w, r, order, max_weight,
+        start_solution(w, r, order, max_weight, start, deadline), rn, top_k,
+    )
+    yield chain
 
     temp = T0
     temps_no_accept = 0
+    started = time.perf_counter()
 
     while temp > Tmin:
-        accept_temp = False
-        for _ in range(iters_per_T):
-            inside = list(chosen)
-            outside = [j for j in all_ids if j not in chosen and r[j] > 0]
-            outside_top = greedy_like_outside(outside, r, w, top_k)
-            worst_in = worst_inside(inside, r, w)
-
-            do_add = (rn.random() < 0.5) or (worst_in is None)
-
-            cand_choice: set[Hashable] | None = None
-            cand_s = ts
-            cand_w = tw
-
-            if do_add and outside_top:
-                for j in outside_top:
-                    wj, rj = w[j], r[j]
-                    if tw + wj <= max_weight:
-                        cand_choice = set(chosen)
-                        cand_choice.add(j)
-                        cand_s = ts + rj
-                        cand_w = tw + wj
-                        break
-            elif (not do_add) and worst_in is not None and outside_top:
-                i = worst_in
-                wi, ri = w[i], r[i]
-                for j in outside_top:
-                    wj, rj = w[j], r[j]
-                    new_w = tw - wi + wj
-                    if new_w <= max_weight:
-                        cand_choice = set(chosen)
-                        cand_choice.discard(i)
-                        cand_choice.add(j)
-                        cand_s = ts - ri + rj
-                        cand_w = new_w
-                        break
-
-            if cand_choice is None:
-                continue
-
-            dE = ts - cand_s
-            if dE <= 0 or rn.random() < math.exp(-dE / temp):
-                chosen = cand_choice
-                ts, tw = cand_s, cand_w
-                accept_temp = True
-
-                if (ts > best_s) or (ts == best_s and tw < best_w):
-                    best, best_s, best_w = list(chosen), ts, tw
+        if deadline is not None and time.monotonic() > deadline:
+            break
+        best = chain.best
+        accept_temp = chain.sweep(temp, iters_per_T, deadline)
+        if stats is not None:
+            stats.count("sa.temperatures")
+            stats.count("sa.proposed", chain.proposed)
+            stats.count("sa.accepted", chain.accepted)
+            stats.event(
+                "sa.temperature", temp=temp, proposed=chain.proposed,
+                accepted=chain.accepted,
+                rate=chain.accepted / chain.proposed if chain.proposed
+                else 0.0,
+                score=chain.ts, best=chain.best_s)
+        if chain.best is not best:
+            yield chain
         temp *= alpha
         if accept_temp:
             temps_no_accept = 0
@@ -133,4 +339,154 @@ def simulated_annealing(
             if temps_no_accept >= patience_temps:
                 break
 
-    return list(best), float(best_s), int(best_w)
+    if stats is not None:
+        stats.add_time("sa.total", time.perf_counter() - started)
+
+
+def anneal_segment(
+    w: list[int],
+    r: list[float],
+    order: list[int],
+    max_weight: int,
+    state: dict,
+    steps: int,
+    rank: Sequence[int] | None = None,
+) -> dict:
+    """Runs one chain for up to steps temperatures and returns its new
+    state. The state is plain data (solution, totals, best, temperature,
+    generator state), so segments can run in any process."""
+    rn = random.Random()
+    rn.setstate(state["rng"])
+    chain = AnnealingChain(w, r, order, max_weight, set(state["chosen"]),
+                           rn, state["top_k"], rank)
+    # keep the running totals, not a recomputed sum, for exact replays
+    chain.ts, chain.tw = state["ts"], state["tw"]
+    chain.best = state["best"]
+    chain.best_s, chain.best_w = state["best_s"], state["best_w"]
+
+    temp, no_accept = state["temp"], state["no_accept"]
+    done = state["done"]
+    deadline = state.get("deadline")
+    for _ in range(steps):
+        if done or temp <= state["Tmin"]:
+            done = True
+            break
+        if deadline is not None and time.monotonic() > deadline:
+            done = True
+            break
+        accept_temp = chain.sweep(temp, state["iters_per_T"], deadline)
+        temp *= state["alpha"]
+        if accept_temp:
+            no_accept = 0
+        else:
+            no_accept += 1
+            if no_accept >= state["patience_temps"]:
+                done = True
+
+    return dict(
+        state, chosen=list(chain.chosen), ts=chain.ts, tw=chain.tw,
+        best=chain.best, best_s=chain.best_s, best_w=chain.best_w,
+        temp=temp, no_accept=no_accept, done=done or temp <= state["Tmin"],
+        rng=rn.getstate(),
+    )
+
+
+def _worker_segment(args: tuple[dict, int]) -> dict:
+    # arrays, order and rank are memoryviews of the published instance
+    state, steps = args
+    return anneal_segment(WORKER["weights"], WORKER["scores"],
+                          WORKER["order"], WORKER["max_weight"], state,
+                          steps, WORKER["rank"])
+
+
+def parallel_tempering(
+    df: pd.DataFrame | KnapsackInstance,
+    max_weight: int,
+    *,
+    chains: int = 4,
+    exchange_interval: int = 10,
+    temp_ratio: float = 1.5,
+    workers: int | None = None,
+    start_choice: Iterable[Hashable] | None = None,
+    seed: int = 42,
+    T0: float = 10.0,
+    Tmin: float = 1e-3,
+    alpha: float = 0.97,
+    iters_per_T: int = 120,
+    top_k: int = 40,
+    patience_temps: int = 3,
+    time_limit: float | None = None,
+    mmap_path: str | None = None,
+) -> Tuple[List[Hashable], float, int]:
+    """Multi-chain Simulated Annealing with replica exchange.
+    Chain c follows the simulated_annealing schedule scaled by
+    temp_ratio ** c (chain 0 uses this seed, so chains=1 ends in the
+    simulated_annealing selection, with a score equal up to float
+    rounding). Every exchange_interval temperatures, neighbouring chains
+    swap their current solutions with the Metropolis probability. With
+    workers > 1 the chains run in a process pool attached to a
+    shared-memory copy of the instance; the result does not depend on the
+    worker count (unless time_limit stops the chains early; time_limit is
+    kept as in simulated_annealing).
+    mmap_path publishes the instance as a memory-mapped file instead of a
+    shared-memory block.
+    Returns the best solution over all chains (choice, score, weight)."""
+    deadline = deadline_after(time_limit)
+    inst = as_instance(df)
+    w = inst.weights.tolist()
+    r = inst.scores.tolist()
+    order = ratio_order(inst)
+    start = None if start_choice is None else inst.positions(start_choice)
+    chosen = start_solution(w, r, order, max_weight, start, deadline)
+    ts = sum(r[i] for i in chosen)
+    tw = sum(w[i] for i in chosen)
+
+    states = []
+    for c in range(max(1, chains)):
+        scale = temp_ratio ** c
+        rn = random.Random(seed if c == 0 else f"sa:{seed}:{c}")
+        states.append(dict(
+            chosen=list(chosen), ts=ts, tw=tw,
+            best=list(chosen), best_s=ts, best_w=tw,
+            temp=T0 * scale, Tmin=Tmin * scale, alpha=alpha,
+            iters_per_T=iters_per_T, top_k=top_k,
+            patience_temps=patience_temps, no_accept=0, done=False,
+            rng=rn.getstate(), deadline=deadline,
+        ))
+    exchange_rn = random.Random(f"sa-exchange:{seed}")
+    steps = max(1, exchange_interval)
+
+    with instance_pool(
+        inst, workers, len(states), {"max_weight": max_weight},
+        sequences=("weights", "scores", "order", "rank"), path=mmap_path,
+        extra=({"order": order, "rank": rank_of(order)}
+               if pool_workers(workers, len(states)) else None),
+    ) as (pool, _):
+        offset = 0
+        while not all(st["done"] for st in states):
+            if pool is not None:
+                states = list(pool.map(_worker_segment,
+                                       [(st, steps) for st in states]))
+            else:
+                states = [anneal_segment(w, r, order, max_weight, st, steps)
+                          for st in states]
+
+            # replica exchange between neighbours, alternating pairings
+            for c in range(offset, len(states) - 1, 2):
+                a, b = states[c], states[c + 1]
+                if a["done"] or b["done"]:
+                    continue
+                x = (b["ts"] - a["ts"]) * (1.0 / a["temp"] - 1.0 / b["temp"])
+                if x >= 0 or exchange_rn.random() < math.exp(x):
+                    for key in ("chosen", "ts", "tw"):
+                        a[key], b[key] = b[key], a[key]
+            offset = 1 - offset
+
+    best = states[0]
+    for st in states[1:]:
+        if (st["best_s"] > best["best_s"]) or (
+                st["best_s"] == best["best_s"]
+                and st["best_w"] < best["best_w"]):
+            best = st
+    return (inst.to_labels(best["best"]), float(best["best_s"]),
+            int(best["best_w"]))
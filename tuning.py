@@ -0,0 +1,210 @@
+"""Parameter tuning for GRASP and simulated annealing by successive
+halving over a process pool.
+
+python tuning.py --solver grasp --budget 51 --configs 27 --workers 4
+"""
+from collections.abc import Callable, Mapping, Sequence
+import argparse
+import itertools
+import json
+import math
+import random
+import time
+import pandas as pd
+from dataset_cache import prepare_dataset_cached
+from instance import KnapsackInstance, as_instance
+from partitioned import resolve_solver
+from shared import WORKER, instance_pool
+
+# solver name -> parameter -> candidate values
+SPACES: dict[str, dict[str, tuple]] = {
+    "grasp": {
+        "rcl_size": (5, 10, 20, 25, 40),
+        "alpha": (0.7, 0.8, 0.9, 1.0),
+        "lambda_w": (0.0, 0.25, 0.5, 1.0),
+        "ls_imp": (1, 2, 3),
+    },
+    "simulated_annealing": {
+        "T0": (1.0, 5.0, 10.0, 20.0),
+        "alpha": (0.9, 0.95, 0.97, 0.99),
+        "iters_per_T": (50, 120, 250),
+        "top_k": (10, 20, 40),
+    },
+}
+# parameters every run gets (as in all_test.py)
+FIXED: dict[str, dict] = {
+    "grasp": {"iterations": 100},
+    "simulated_annealing": {"Tmin": 1e-3},
+}
+OBJECTIVES = ("score_per_cpu", "score")
+
+
+def sample_configs(
+    space: Mapping[str, Sequence],
+    n: int | None,
+    seed: int = 0,
+) -> list[dict]:
+    """n distinct configurations drawn from the grid (all of it when n is
+    None or not smaller), in a seed-determined order."""
+    names = list(space)
+    grid = list(itertools.product(*(space[name] for name in names)))
+    rng = random.Random(seed)
+    picked = (grid if n is None or n >= len(grid)
+              else rng.sample(grid, n))
+    return [dict(zip(names, values)) for values in picked]
+
+
+def run_config(
+    inst: KnapsackInstance,
+    max_weight: int,
+    solver: str | Callable,
+    params: dict,
+    seed: int,
+) -> tuple[float, int, float]:
+    """(score, weight, CPU seconds of this process) of one seeded run."""
+    fn = resolve_solver(solver)
+    t0 = time.process_time()
+    _, score, weight = fn(inst, max_weight, seed=seed, **params)
+    return float(score), int(weight), time.process_time() - t0
+
+
+def _worker_run(task: tuple[int, dict, int]) -> tuple[int, int, tuple]:
+    index, params, seed = task
+    return index, seed, run_config(WORKER["inst"], WORKER["max_weight"],
+                                   WORKER["solver"], params, seed)
+
+
+def _summary(runs: list[tuple[float, int, float]]) -> dict:
+    scores = [s for s, _, _ in runs]
+    cpu = sum(c for _, _, c in runs)
+    mean = sum(scores) / len(scores)
+    return {"runs": len(runs), "score": mean, "best_score": max(scores),
+            "weight": sum(w for _, w, _ in runs) / len(runs),
+            "cpu": cpu / len(runs),
+            "score_per_cpu": mean / max(cpu / len(runs), 1e-9)}
+
+
+def successive_halving(
+    df: pd.DataFrame | KnapsackInstance,
+    max_weight: int,
+    *,
+    solver: str = "grasp",
+    space: Mapping[str, Sequence] | None = None,
+    fixed: Mapping | None = None,
+    configs: int | None = 27,
+    eta: int = 3,
+    min_runs: int = 1,
+    max_runs: int = 9,
+    objective: str = "score_per_cpu",
+    seed: int = 0,
+    workers: int | None = None,
+    mmap_path: str | None = None,
+    log: Callable[[str], None] | None = None,
+) -> dict:
+    """Tunes solver over space (SPACES[solver] by default) on one
+    instance. Each rung runs every surviving configuration on more seeds
+    (min_runs, then eta times as many, up to max_runs; seeds are shared so
+    configurations meet the same draws), ranks them by the mean of the
+    objective ("score_per_cpu": mean score per CPU-second of one run, or
+    "score") and keeps the best 1/eta, so weak configurations only cost
+    the small early budgets. Runs already made are reused in later rungs.
+    With workers > 1 the runs go to a process pool attached to the
+    instance in shared memory (or a memory-mapped file at mmap_path); CPU
+    time is measured inside each run, so it does not depend on the pool.
+    Returns a report with the best configuration, every configuration's
+    summary and the survivors of each rung."""
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {OBJECTIVES}")
+    inst = as_instance(df)
+    candidates = sample_configs(
+        SPACES[solver] if space is None else space, configs, seed)
+    fixed = dict(FIXED.get(solver, {}) if fixed is None else fixed)
+    params = [{**fixed, **config} for config in candidates]
+    runs: list[dict[int, tuple]] = [{} for _ in candidates]
+    alive = list(range(len(candidates)))
+    rungs = []
+
+    with instance_pool(
+        inst, workers, len(candidates),
+        {"max_weight": max_weight, "solver": solver}, path=mmap_path,
+    ) as (pool, _):
+        n_runs = min_runs
+        while True:
+            n_runs = min(n_runs, max_runs)
+            tasks = [(i, params[i], seed + k) for i in alive
+                     for k in range(n_runs) if seed + k not in runs[i]]
+            if pool is not None:
+                results = pool.map(_worker_run, tasks)
+            else:
+                results = ((i, s, run_config(inst, max_weight, solver,
+                                             p, s)) for i, p, s in tasks)
+            for i, s, res in results:
+                runs[i][s] = res
+            ranked = sorted(
+                alive, key=lambda i: (-_summary(list(runs[i].values()))
+                                      [objective], i))
+            keep = max(1, math.ceil(len(alive) / eta))
+            rungs.append({"runs": n_runs, "configs": len(alive),
+                          "kept": ranked[:keep]})
+            if log is not None:
+                top = _summary(list(runs[ranked[0]].values()))
+                log(f"rung {len(rungs)}: {len(alive)} configs x {n_runs} "
+                    f"runs, best {candidates[ranked[0]]} "
+                    f"score={top['score']:.2f} cpu={top['cpu']:.3f}s")
+            if len(alive) == 1 or n_runs >= max_runs:
+                alive = ranked
+                break
+            alive = ranked[:keep]
+            n_runs *= eta
+
+    summaries = [{"params": config, **_summary(list(r.values()))}
+                 for config, r in zip(candidates, runs) if r]
+    best = alive[0]
+    return {
+        "solver": solver,
+        "max_weight": max_weight,
+        "objective": objective,
+        "fixed": fixed,
+        "best": {"params": candidates[best],
+                 **_summary(list(runs[best].values()))},
+        "rungs": rungs,
+        "configs": summaries,
+        "cpu_total": sum(c for r in runs for _, _, c in r.values()),
+    }
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--solver", choices=list(SPACES), default="grasp")
+    parser.add_argument("--data", default="data.csv")
+    parser.add_argument("--budget", type=int, default=51)
+    parser.add_argument("--configs", type=int, default=27,
+                        help="configurations sampled from the grid "
+                             "(0 = whole grid)")
+    parser.add_argument("--eta", type=int, default=3)
+    parser.add_argument("--min-runs", type=int, default=1)
+    parser.add_argument("--max-runs", type=int, default=9)
+    parser.add_argument("--objective", choices=OBJECTIVES,
+                        default="score_per_cpu")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--out", help="write the full report as JSON")
+    args = parser.parse_args(argv)
+
+    report = successive_halving(
+        prepare_dataset_cached(args.data), args.budget, solver=args.solver,
+        configs=args.configs or None, eta=args.eta, min_runs=args.min_runs,
+        max_runs=args.max_runs, objective=args.objective, seed=args.seed,
+        workers=args.workers, log=print)
+    best = report["best"]
+    print(f"best {args.solver} {best['params']}: score={best['score']:.2f} "
+          f"cpu={best['cpu']:.3f}s "
+          f"score/cpu-s={best['score_per_cpu']:.1f} "
+          f"(total {report['cpu_total']:.1f} cpu-s)")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()